@@ -1,7 +1,432 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import bisect
+import functools
+import itertools
 import json
 import os
+import re
+
+from todo_store import quarantine, write_atomic
+
+# Saves within this window are written together (0 writes every change at once)
+SAVE_DELAY_MS = 200
+SEARCH_DEBOUNCE_MS = 150
+# Type-ahead shows at most this many matches
+SEARCH_LIMIT = 1000
+# Fuzzy search tolerates up to this many typos per word (fewer in short words),
+# looking at only the first FUZZY_PREFIX letters when indexing
+FUZZY_DISTANCE = 2
+FUZZY_PREFIX = 7
+# Numbers agreeing in this many trailing digits count as the same number,
+# so "+1 555 123 4567" and "555-123-4567" are caught as duplicates
+MATCH_DIGITS = 7
+# Merging more contacts than this at once rebuilds the indexes instead of
+# updating them one contact at a time
+MERGE_REBUILD_AT = 1000
+# The duplicates dialog lists at most this many groups; Merge All merges those
+DUPLICATE_LIST_LIMIT = 1000
+NON_DIGITS = re.compile(r"\D+")
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(["aeiouy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"])
+                 for letter in letters}
+LETTERS = re.compile(r"[^\W\d_]+")
+
+
+def normalize_name(name):
+    return " ".join(name.casefold().split())
+
+
+def normalize_phone(phone):
+    return NON_DIGITS.sub("", phone)
+
+
+class PrefixIndex:
+    # Sorted (key, id) pairs searched with bisect: a prefix lookup is one
+    # binary search plus a walk over the matches, which come out in key order
+    def __init__(self, pairs=()):
+        self.entries = sorted(pairs)
+
+    def add(self, key, contact_id):
+        bisect.insort(self.entries, (key, contact_id))
+
+    def remove(self, key, contact_id):
+        i = bisect.bisect_left(self.entries, (key, contact_id))
+        if i < len(self.entries) and self.entries[i] == (key, contact_id):
+            del self.entries[i]
+
+    def count(self, prefix):
+        # Number of keys starting with prefix, from two binary searches
+        return bisect.bisect_left(self.entries, (prefix + "\U0010ffff",)) - bisect.bisect_left(self.entries, (prefix,))
+
+    def search(self, prefix):
+        i = bisect.bisect_left(self.entries, (prefix,))
+        while i < len(self.entries) and self.entries[i][0].startswith(prefix):
+            yield self.entries[i][1]
+            i += 1
+
+
+def name_words(name):
+    return set(normalize_name(name).split())
+
+
+# Names repeat a lot across a book, so their codes are worth remembering
+@functools.lru_cache(maxsize=65536)
+def soundex(word):
+    # American Soundex: the first letter and the codes of the next three
+    # consonant sounds, so "smith" and "smyth" both give "s530"
+    letters = [ch for ch in word if ch in SOUNDEX_CODES or ch in "hw"]
+    if not letters:
+        return word
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0])
+    for ch in letters[1:]:
+        if ch in "hw":
+            continue
+        digit = SOUNDEX_CODES[ch]
+        if digit != "0" and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        previous = digit
+    return code.ljust(4, "0")
+
+
+def name_key(name):
+    # How the name sounds, whatever the order of its words
+    return " ".join(sorted(soundex(word) for word in normalize_name(name).split()))
+
+
+def blocking_keys(contact):
+    # Contacts sharing one of these are taken for the same person: the email,
+    # or the phone number together with how the name sounds (one number
+    # alone may be a household's or an office's)
+    email = contact.get("email", "").strip().casefold()
+    if email:
+        yield ("email", email)
+    if len(contact["digits"]) >= MATCH_DIGITS:
+        yield ("phone", contact["digits"][-MATCH_DIGITS:], name_key(contact["name"]))
+
+
+def merge_fields(contact, others):
+    # Fills the contact's empty fields from the others, first come first served
+    for other in others:
+        for field in ("email", "address"):
+            if not contact.get(field) and other.get(field):
+                contact[field] = other[field]
+
+
+def merge_losses(contact, others):
+    # The others' values merge_fields would drop because the merged contact
+    # keeps a different one, as (field, value) pairs
+    merged = dict(contact)
+    merge_fields(merged, others)
+    same = {
+        "name": normalize_name,
+        "phone": normalize_phone,
+        "email": lambda value: value.strip().casefold(),
+        "address": lambda value: value.strip()
+    }
+    losses = []
+    for other in others:
+        for field, key in same.items():
+            value = other.get(field, "")
+            if value and key(value) != key(merged.get(field, "")) and (field, value) not in losses:
+                losses.append((field, value))
+    return losses
+
+
+def contact_terms(contact):
+    # Words fuzzy search matches: the name's words and the letter runs of the email
+    return name_words(contact["name"]) | set(LETTERS.findall(contact.get("email", "").casefold()))
+
+
+def typo_limit(word):
+    return 0 if len(word) < 3 else 1 if len(word) < 6 else FUZZY_DISTANCE
+
+
+def deletes(word, distance):
+    # Every string reachable from word by deleting up to `distance` letters
+    found = {word}
+    edits = {word}
+    for _ in range(distance):
+        edits = {edit[:i] + edit[i + 1:] for edit in edits for i in range(len(edit))}
+        found |= edits
+    found.discard("")
+    return found
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance counting an adjacent swap as one edit ("jhon" is
+    # one edit from "john"); gives up with limit + 1 once that is certain
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    # Deletion dictionary (as in SymSpell): each word is filed under every
+    # string left after deleting up to FUZZY_DISTANCE of its letters, so the
+    # words within a few typos of a query are the ones sharing a deletion
+    # with it. Only those few are compared letter by letter, never the whole book
+    def __init__(self, contacts=()):
+        self.postings = {}
+        self.deletes = {}
+        for contact in contacts:
+            self.add(contact)
+
+    def add(self, contact):
+        for term in contact_terms(contact):
+            ids = self.postings.get(term)
+            if ids is None:
+                ids = self.postings[term] = set()
+                for key in deletes(term[:FUZZY_PREFIX], FUZZY_DISTANCE):
+                    self.deletes.setdefault(key, []).append(term)
+            ids.add(contact["id"])
+
+    def remove(self, contact):
+        for term in contact_terms(contact):
+            ids = self.postings.get(term)
+            if ids is None:
+                continue
+            ids.discard(contact["id"])
+            if not ids:
+                del self.postings[term]
+                for key in deletes(term[:FUZZY_PREFIX], FUZZY_DISTANCE):
+                    terms = self.deletes[key]
+                    terms.remove(term)
+                    if not terms:
+                        del self.deletes[key]
+
+    def similar(self, word):
+        # Indexed words within typo_limit(word) edits, with their distance
+        limit = typo_limit(word)
+        if limit == 0:
+            return {word: 0} if word in self.postings else {}
+        found = {}
+        checked = set()
+        for key in deletes(word[:FUZZY_PREFIX], limit):
+            for term in self.deletes.get(key, ()):
+                if term not in checked:
+                    checked.add(term)
+                    distance = edit_distance(word, term, limit)
+                    if distance <= limit:
+                        found[term] = distance
+        return found
+
+    def count_typos(self, matches, contact_id):
+        # Typos in the contact's closest word for each of `matches`, summed, or
+        # None if one of them has no close word in the contact
+        total = 0
+        for similar in matches:
+            typos = min((distance for term, distance in similar.items() if contact_id in self.postings[term]), default=None)
+            if typos is None:
+                return None
+            total += typos
+        return total
+
+    def search(self, query, contacts, limit=None):
+        # Ids of contacts with a close word for every word of the query, fewest
+        # typos first and then by name
+        matches = [self.similar(word) for word in set(normalize_name(query).split())]
+        if not matches or not all(matches):
+            return []
+        # Walk the word with the fewest contacts, closest words first, and check
+        # the other words per contact
+        matches.sort(key=lambda terms: sum(len(self.postings[term]) for term in terms))
+        found = []
+        counts = [0] * (FUZZY_DISTANCE * len(matches) + 1)
+        seen = set()
+        # The fewest typos the other words can add
+        least = sum(min(similar.values()) for similar in matches[1:])
+        for term, distance in sorted(matches[0].items(), key=lambda item: item[1]):
+            # Contacts still to come have at least distance + least typos, so
+            # stop once there are enough with no more than that
+            enough = sum(counts[:distance + least + 1])
+            for contact_id in self.postings[term]:
+                if limit is not None and enough >= limit:
+                    break
+                if contact_id in seen:
+                    continue
+                seen.add(contact_id)
+                score = self.count_typos(matches[1:], contact_id)
+                if score is None:
+                    continue
+                score += distance
+                found.append((score, contact_id))
+                counts[score] += 1
+                if score == distance + least:
+                    enough += 1
+        found.sort(key=lambda item: (item[0], normalize_name(contacts[item[1]]["name"])))
+        return [contact_id for score, contact_id in found[:limit]]
+
+
+class DuplicateIndex:
+    # Contacts filed under their blocking keys, so finding a contact's
+    # duplicates is a few dict lookups and finding every group of duplicates
+    # is one pass over the keys, never a comparison of each pair of contacts
+    def __init__(self, contacts=()):
+        self.blocks = {}
+        for contact in contacts:
+            self.add(contact)
+
+    def add(self, contact):
+        for key in blocking_keys(contact):
+            self.blocks.setdefault(key, set()).add(contact["id"])
+
+    def remove(self, contact):
+        for key in blocking_keys(contact):
+            ids = self.blocks.get(key)
+            if ids is not None:
+                ids.discard(contact["id"])
+                if not ids:
+                    del self.blocks[key]
+
+    def matches(self, contact):
+        ids = set()
+        for key in blocking_keys(contact):
+            ids |= self.blocks.get(key, set())
+        ids.discard(contact.get("id"))
+        return ids
+
+    def groups(self, contacts):
+        # Contacts linked through shared keys, gathered with union-find and
+        # then split so that every contact in a group shares a key with each
+        # of the others: A sharing an email with B and B a phone with C does
+        # not make A and C the same person. Each group is sorted by id and the
+        # groups by their first id
+        parent = {}
+
+        def find(contact_id):
+            while parent[contact_id] != contact_id:
+                parent[contact_id] = parent[parent[contact_id]]
+                contact_id = parent[contact_id]
+            return contact_id
+
+        for ids in self.blocks.values():
+            if len(ids) < 2:
+                continue
+            first, *rest = ids
+            root = find(parent.setdefault(first, first))
+            for contact_id in rest:
+                other = find(parent.setdefault(contact_id, contact_id))
+                if other != root:
+                    parent[other] = root
+
+        components = {}
+        for contact_id in parent:
+            components.setdefault(find(contact_id), []).append(contact_id)
+
+        groups = []
+        for component in components.values():
+            # Each contact joins the first group it shares a key with every
+            # member of; a group's members by key answer that without
+            # comparing the contact with each member in turn
+            split = []
+            for contact_id in sorted(component):
+                keys = set(blocking_keys(contacts[contact_id]))
+                for members, by_key in split:
+                    sharing = [by_key[key] for key in keys if key in by_key]
+                    if any(len(ids) == len(members) for ids in sharing) or len(set().union(*sharing)) == len(members):
+                        members.append(contact_id)
+                        for key in keys:
+                            by_key.setdefault(key, set()).add(contact_id)
+                        break
+                else:
+                    split.append(([contact_id], {key: {contact_id} for key in keys}))
+            groups.extend(members for members, by_key in split if len(members) > 1)
+        return sorted(groups)
+
+
+class ContactIndex:
+    # Prefix indexes over name words and phone digits for type-ahead search;
+    # contacts themselves are found by id in ContactBook.contacts. Phone
+    # digits are also indexed reversed, which makes "ends with these digits"
+    # a prefix lookup too, and an exact name or number is just a prefix
+    # that happens to be whole
+    def __init__(self, contacts=()):
+        words, phones, suffixes = [], [], []
+        for contact in contacts:
+            digits = contact["digits"]
+            words.extend((word, contact["id"]) for word in name_words(contact["name"]))
+            phones.append((digits, contact["id"]))
+            suffixes.append((digits[::-1], contact["id"]))
+        # Built in one sort rather than one insort per contact
+        self.words = PrefixIndex(words)
+        self.phones = PrefixIndex(phones)
+        self.suffixes = PrefixIndex(suffixes)
+        # Built on the first fuzzy search or duplicate check, so books that
+        # never use them don't pay for them
+        self.fuzzy = None
+        self.duplicates = None
+
+    def add(self, contact):
+        for word in name_words(contact["name"]):
+            self.words.add(word, contact["id"])
+        self.phones.add(contact["digits"], contact["id"])
+        self.suffixes.add(contact["digits"][::-1], contact["id"])
+        if self.fuzzy is not None:
+            self.fuzzy.add(contact)
+        if self.duplicates is not None:
+            self.duplicates.add(contact)
+
+    def remove(self, contact):
+        for word in name_words(contact["name"]):
+            self.words.remove(word, contact["id"])
+        self.phones.remove(contact["digits"], contact["id"])
+        self.suffixes.remove(contact["digits"][::-1], contact["id"])
+        if self.fuzzy is not None:
+            self.fuzzy.remove(contact)
+        if self.duplicates is not None:
+            self.duplicates.remove(contact)
+
+    def search(self, query, contacts, limit=None):
+        # Ids whose name has a word starting with every word of the query or,
+        # for a query without letters, whose number starts or ends with its digits
+        results = []
+        seen = set()
+        if any(ch.isalpha() for ch in query):
+            words = sorted(normalize_name(query).split(), key=self.words.count)
+            # Walk the word with the fewest matches and check the others per match
+            candidates = self.words.search(words[0])
+        else:
+            words = []
+            digits = normalize_phone(query)
+            candidates = itertools.chain(self.phones.search(digits), self.suffixes.search(digits[::-1])) if digits else ()
+
+        for contact_id in candidates:
+            if contact_id in seen:
+                continue
+            seen.add(contact_id)
+            if words[1:]:
+                have = name_words(contacts[contact_id]["name"])
+                if not all(any(word.startswith(w) for word in have) for w in words[1:]):
+                    continue
+            results.append(contact_id)
+            if len(results) == limit:
+                break
+        return results
+
+    def fuzzy_search(self, query, contacts, limit=None):
+        if self.fuzzy is None:
+            self.fuzzy = FuzzyIndex(contacts.values())
+        return self.fuzzy.search(query, contacts, limit)
+
+    def duplicate_index(self, contacts):
+        if self.duplicates is None:
+            self.duplicates = DuplicateIndex(contacts.values())
+        return self.duplicates
 
 
 class ContactBook:
@@ -10,15 +435,19 @@ class ContactBook:
         self.root.title("Colorful Contact Book")
         self.root.geometry("800x600")
         self.root.configure(bg="#f0f8ff")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.save_job = None
 
         # Create data file if it doesn't exist
         self.data_file = "contacts.json"
         if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as f:
-                json.dump([], f)
+            write_atomic(self.data_file, b"[]")
 
-        # Load contacts
-        self.contacts = self.load_contacts()
+        # Load contacts, keyed by their id
+        self.contacts = {}
+        self.next_id = 1
+        self.search_job = None
+        self.add_loaded(self.load_contacts())
 
         # Create GUI elements
         self.create_widgets()
@@ -28,14 +457,45 @@ class ContactBook:
 
     def load_contacts(self):
         try:
-            with open(self.data_file, 'r') as f:
+            with open(self.data_file, 'r', encoding="utf-8") as f:
                 return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+        except FileNotFoundError:
+            return []
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # Keep the damaged file instead of overwriting it on the next save
+            corrupt_file = quarantine(self.data_file)
+            messagebox.showwarning("Warning", f"{self.data_file} could not be read and was moved to {corrupt_file}")
             return []
 
+    def add_loaded(self, contacts):
+        # Contacts saved before they had ids or digits get them now, ids in file order
+        self.next_id = max((c["id"] for c in contacts if "id" in c), default=0) + 1
+        for contact in contacts:
+            if "id" not in contact:
+                contact["id"] = self.next_id
+                self.next_id += 1
+            if "digits" not in contact:
+                contact["digits"] = normalize_phone(contact["phone"])
+            self.contacts[contact["id"]] = contact
+        self.index = ContactIndex(contacts)
+
     def save_contacts(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.contacts, f, indent=2)
+        # Coalesce bursts of edits into one write; on_close flushes the rest
+        if SAVE_DELAY_MS <= 0:
+            self.flush_contacts()
+        elif self.save_job is None:
+            self.save_job = self.root.after(SAVE_DELAY_MS, self.flush_contacts)
+
+    def flush_contacts(self):
+        if self.save_job is not None:
+            self.root.after_cancel(self.save_job)
+            self.save_job = None
+        write_atomic(self.data_file, json.dumps(list(self.contacts.values()), indent=2).encode())
+
+    def on_close(self):
+        if self.save_job is not None:
+            self.flush_contacts()
+        self.root.destroy()
 
     def create_widgets(self):
         # Main frame
@@ -67,6 +527,7 @@ class ContactBook:
             bd=2
         )
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
 
         search_btn = tk.Button(
             search_frame,
@@ -92,6 +553,19 @@ class ContactBook:
         )
         clear_search_btn.pack(side=tk.LEFT, padx=(5, 0))
 
+        # Fuzzy mode also finds names and emails with typos ("jhon" finds John)
+        self.fuzzy_var = tk.BooleanVar()
+        fuzzy_check = tk.Checkbutton(
+            search_frame,
+            text="Fuzzy",
+            variable=self.fuzzy_var,
+            command=self.search_contact,
+            bg="#f0f8ff",
+            fg="#333333",
+            font=("Arial", 12)
+        )
+        fuzzy_check.pack(side=tk.LEFT, padx=(5, 0))
+
         # Contacts list
         self.tree = ttk.Treeview(
             main_frame,
@@ -178,6 +652,18 @@ class ContactBook:
         )
         delete_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
+        duplicates_btn = tk.Button(
+            button_frame,
+            text="🧹 Duplicates",
+            command=self.find_duplicates,
+            bg="#a29bfe",
+            fg="white",
+            font=("Arial", 12, "bold"),
+            relief=tk.RAISED,
+            bd=2
+        )
+        duplicates_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
         # Configure grid weights
         main_frame.grid_rowconfigure(2, weight=1)
         main_frame.grid_columnconfigure(0, weight=1)
@@ -188,23 +674,32 @@ class ContactBook:
             self.tree.delete(item)
 
         # Display all contacts or filtered contacts
-        contacts_to_display = contacts if contacts is not None else self.contacts
+        contacts_to_display = contacts if contacts is not None else self.contacts.values()
 
         for contact in contacts_to_display:
-            self.tree.insert("", tk.END, values=(contact["name"], contact["phone"]))
+            self.tree.insert("", tk.END, iid=str(contact["id"]), values=(contact["name"], contact["phone"]))
+
+    def selected_contact(self):
+        # Rows are keyed by contact id, so this is a dict lookup
+        selected = self.tree.selection()
+        return self.contacts.get(int(selected[0])) if selected else None
+
+    def schedule_search(self):
+        # Search as the user types, once per pause rather than per keystroke
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.search_contact)
 
     def search_contact(self):
-        query = self.search_var.get().lower()
+        self.search_job = None
+        query = self.search_var.get().strip()
         if not query:
             self.display_contacts()
             return
 
-        results = [
-            contact for contact in self.contacts
-            if query in contact["name"].lower() or query in contact["phone"]
-        ]
-
-        self.display_contacts(results)
+        search = self.index.fuzzy_search if self.fuzzy_var.get() else self.index.search
+        results = search(query, self.contacts, SEARCH_LIMIT)
+        self.display_contacts([self.contacts[contact_id] for contact_id in results])
 
     def clear_search(self):
         self.search_var.set("")
@@ -214,19 +709,12 @@ class ContactBook:
         self.contact_form("Add New Contact", self.save_new_contact)
 
     def update_contact_window(self):
-        selected = self.tree.selection()
-        if not selected:
+        contact = self.selected_contact()
+        if not contact:
             messagebox.showwarning("Warning", "Please select a contact to update.")
             return
 
-        # Get the selected contact details
-        item = self.tree.item(selected[0])
-        name = item["values"][0]
-
-        # Find the full contact details
-        contact = next((c for c in self.contacts if c["name"] == name), None)
-        if contact:
-            self.contact_form("Update Contact", self.save_updated_contact, contact)
+        self.contact_form("Update Contact", functools.partial(self.save_updated_contact, contact["id"]), contact)
 
     def contact_form(self, title, save_command, contact=None):
         # Create a new window
@@ -363,152 +851,321 @@ class ContactBook:
             return
 
         new_contact = {
+            "id": self.next_id,
             "name": name,
             "phone": phone,
+            # The number's digits alone, which is what search compares
+            "digits": normalize_phone(phone),
             "email": email,
             "address": address
         }
 
-        self.contacts.append(new_contact)
+        matches = self.index.duplicate_index(self.contacts).matches(new_contact)
+        if matches:
+            existing = self.contacts[min(matches)]
+            losses = merge_losses(existing, [new_contact])
+            dropped = "".join(f"\n  {field.title()}: {value}" for field, value in losses)
+            if dropped:
+                dropped = "\nThat contact keeps its own values, so these would not be saved:" + dropped
+            answer = messagebox.askyesnocancel(
+                "Possible Duplicate",
+                f"{name} looks like {existing['name']} ({existing['phone']}), who is already saved.\n\n"
+                f"Yes: fill in that contact's empty email and address from the new details{dropped}\n"
+                "No: save a separate contact",
+                parent=window
+            )
+            if answer is None:
+                return
+            if answer:
+                self.merge_group([existing["id"]], [new_contact])
+                self.save_contacts()
+                window.destroy()
+                messagebox.showinfo("Success", f"Details added to {existing['name']}.")
+                return
+        self.next_id += 1
+
+        self.contacts[new_contact["id"]] = new_contact
+        self.index.add(new_contact)
         self.save_contacts()
-        self.display_contacts()
+        self.tree.insert("", tk.END, iid=str(new_contact["id"]), values=(name, phone))
         window.destroy()
         messagebox.showinfo("Success", "Contact added successfully!")
 
-    def save_updated_contact(self, name, phone, email, address, window):
+    def save_updated_contact(self, contact_id, name, phone, email, address, window):
         if not name or not phone:
             messagebox.showerror("Error", "Name and phone are required fields.")
             return
 
-        # Find the contact to update
-        selected = self.tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "No contact selected.")
+        contact = self.contacts.get(contact_id)
+        if contact is None:
+            messagebox.showwarning("Warning", "This contact no longer exists.")
+            window.destroy()
             return
 
-        item = self.tree.item(selected[0])
-        old_name = item["values"][0]
-
-        # Find the contact in the list
-        for contact in self.contacts:
-            if contact["name"] == old_name:
-                contact["name"] = name
-                contact["phone"] = phone
-                contact["email"] = email
-                contact["address"] = address
-                break
+        self.index.remove(contact)
+        contact.update(name=name, phone=phone, digits=normalize_phone(phone), email=email, address=address)
+        self.index.add(contact)
 
         self.save_contacts()
-        self.display_contacts()
+        if self.tree.exists(str(contact_id)):
+            self.tree.item(str(contact_id), values=(name, phone))
         window.destroy()
         messagebox.showinfo("Success", "Contact updated successfully!")
 
     def view_contact(self):
-        selected = self.tree.selection()
-        if not selected:
+        contact = self.selected_contact()
+        if not contact:
             messagebox.showwarning("Warning", "Please select a contact to view.")
             return
 
-        # Get the selected contact details
-        item = self.tree.item(selected[0])
-        name = item["values"][0]
+        # Create a details window
+        details_window = tk.Toplevel(self.root)
+        details_window.title(f"Contact Details - {contact['name']}")
+        details_window.geometry("400x300")
+        details_window.configure(bg="#e6f3ff")
 
-        # Find the full contact details
-        contact = next((c for c in self.contacts if c["name"] == name), None)
-        if contact:
-            # Create a details window
-            details_window = tk.Toplevel(self.root)
-            details_window.title(f"Contact Details - {name}")
-            details_window.geometry("400x300")
-            details_window.configure(bg="#e6f3ff")
-
-            # Header
-            tk.Label(
-                details_window,
-                text=f"Contact Details",
-                font=("Arial", 16, "bold"),
-                bg="#e6f3ff",
-                fg="#2d5985"
-            ).pack(pady=10)
-
-            # Details frame
-            details_frame = tk.Frame(details_window, bg="#e6f3ff")
-            details_frame.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
-
-            # Name
-            tk.Label(
-                details_frame,
-                text=f"Name: {contact['name']}",
-                bg="#e6f3ff",
-                fg="#333333",
-                font=("Arial", 12),
-                anchor="w"
-            ).pack(fill=tk.X, pady=5)
-
-            # Phone
-            tk.Label(
-                details_frame,
-                text=f"Phone: {contact['phone']}",
-                bg="#e6f3ff",
-                fg="#333333",
-                font=("Arial", 12),
-                anchor="w"
-            ).pack(fill=tk.X, pady=5)
-
-            # Email
-            tk.Label(
-                details_frame,
-                text=f"Email: {contact.get('email', 'N/A')}",
-                bg="#e6f3ff",
-                fg="#333333",
-                font=("Arial", 12),
-                anchor="w"
-            ).pack(fill=tk.X, pady=5)
-
-            # Address
-            address_label = tk.Label(
-                details_frame,
-                text=f"Address:\n{contact.get('address', 'N/A')}",
-                bg="#e6f3ff",
-                fg="#333333",
-                font=("Arial", 12),
-                justify=tk.LEFT,
-                anchor="nw",
-                wraplength=350
-            )
-            address_label.pack(fill=tk.BOTH, expand=True, pady=5)
-
-            # Close button
-            close_btn = tk.Button(
-                details_window,
-                text="Close",
-                command=details_window.destroy,
-                bg="#2d5985",
-                fg="white",
-                font=("Arial", 12),
-                relief=tk.RAISED,
-                bd=2
-            )
-            close_btn.pack(pady=10)
+        # Header
+        tk.Label(
+            details_window,
+            text=f"Contact Details",
+            font=("Arial", 16, "bold"),
+            bg="#e6f3ff",
+            fg="#2d5985"
+        ).pack(pady=10)
+
+        # Details frame
+        details_frame = tk.Frame(details_window, bg="#e6f3ff")
+        details_frame.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
+
+        # Name
+        tk.Label(
+            details_frame,
+            text=f"Name: {contact['name']}",
+            bg="#e6f3ff",
+            fg="#333333",
+            font=("Arial", 12),
+            anchor="w"
+        ).pack(fill=tk.X, pady=5)
+
+        # Phone
+        tk.Label(
+            details_frame,
+            text=f"Phone: {contact['phone']}",
+            bg="#e6f3ff",
+            fg="#333333",
+            font=("Arial", 12),
+            anchor="w"
+        ).pack(fill=tk.X, pady=5)
+
+        # Email
+        tk.Label(
+            details_frame,
+            text=f"Email: {contact.get('email', 'N/A')}",
+            bg="#e6f3ff",
+            fg="#333333",
+            font=("Arial", 12),
+            anchor="w"
+        ).pack(fill=tk.X, pady=5)
+
+        # Address
+        address_label = tk.Label(
+            details_frame,
+            text=f"Address:\n{contact.get('address', 'N/A')}",
+            bg="#e6f3ff",
+            fg="#333333",
+            font=("Arial", 12),
+            justify=tk.LEFT,
+            anchor="nw",
+            wraplength=350
+        )
+        address_label.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        # Close button
+        close_btn = tk.Button(
+            details_window,
+            text="Close",
+            command=details_window.destroy,
+            bg="#2d5985",
+            fg="white",
+            font=("Arial", 12),
+            relief=tk.RAISED,
+            bd=2
+        )
+        close_btn.pack(pady=10)
+
+    def merge_group(self, ids, extra=()):
+        # Folds the contacts into the one added first, which keeps its own
+        # values and takes the others' where it has none
+        survivor, *others = [self.contacts[contact_id] for contact_id in sorted(ids)]
+        others += extra
+        self.index.remove(survivor)
+        merge_fields(survivor, others)
+        self.index.add(survivor)
+        for other in others:
+            if other["id"] in self.contacts:
+                self.index.remove(other)
+                del self.contacts[other["id"]]
+                if self.tree.exists(str(other["id"])):
+                    self.tree.delete(str(other["id"]))
+
+    def merge_groups(self, groups):
+        # Contacts merged away since the groups were found are skipped
+        groups = [group for group in ([i for i in group if i in self.contacts] for group in groups) if len(group) > 1]
+        if sum(len(group) - 1 for group in groups) <= MERGE_REBUILD_AT:
+            for group in groups:
+                self.merge_group(group)
+            self.save_contacts()
+            return
+
+        # Cheaper to merge the dicts and index the survivors once
+        for group in groups:
+            survivor, *others = [self.contacts[contact_id] for contact_id in group]
+            merge_fields(survivor, others)
+            for other in others:
+                del self.contacts[other["id"]]
+        self.index = ContactIndex(list(self.contacts.values()))
+        self.save_contacts()
+        self.search_contact()
+
+    def find_duplicates(self):
+        groups = self.index.duplicate_index(self.contacts).groups(self.contacts)
+        if not groups:
+            messagebox.showinfo("Duplicates", "No duplicate contacts found.")
+            return
+
+        dup_window = tk.Toplevel(self.root)
+        dup_window.title("Duplicate Contacts")
+        dup_window.geometry("600x400")
+        dup_window.configure(bg="#e6f3ff")
+        dup_window.grab_set()
+
+        hidden = max(0, len(groups) - DUPLICATE_LIST_LIMIT)
+        groups = groups[:DUPLICATE_LIST_LIMIT]
+        heading = f"{len(groups)} groups of possible duplicates"
+        if hidden:
+            heading += f" ({hidden} more not listed)"
+        tk.Label(
+            dup_window,
+            text=heading,
+            font=("Arial", 16, "bold"),
+            bg="#e6f3ff",
+            fg="#2d5985"
+        ).pack(pady=10)
+
+        tk.Label(
+            dup_window,
+            text="Merging keeps the first contact of a group and only fills its empty email and address from the "
+                 "others. Values listed under Not kept are lost. Merge All merges only the groups listed here.",
+            bg="#e6f3ff",
+            fg="#333333",
+            font=("Arial", 10),
+            wraplength=560
+        ).pack(pady=(0, 10))
+
+        # Groups are parent rows ("g0", "g1", ...) with their contacts beneath
+        dup_tree = ttk.Treeview(dup_window, columns=("Name", "Phone", "Email", "Not kept"), show="tree headings")
+        dup_tree.heading("Name", text="Name")
+        dup_tree.heading("Phone", text="Phone")
+        dup_tree.heading("Email", text="Email")
+        dup_tree.heading("Not kept", text="Not kept")
+        dup_tree.column("#0", width=90)
+        dup_tree.pack(fill=tk.BOTH, expand=True, padx=20)
+        losses = {}
+        for number, group in enumerate(groups):
+            survivor, *others = [self.contacts[contact_id] for contact_id in group]
+            losses[number] = merge_losses(survivor, others)
+            dropped = ", ".join(f"{field} {value}" for field, value in losses[number])
+            dup_tree.insert("", tk.END, iid=f"g{number}", text=f"{len(group)} contacts", values=("", "", "", dropped),
+                            open=True)
+            for contact_id in group:
+                contact = self.contacts[contact_id]
+                dup_tree.insert(f"g{number}", tk.END, iid=str(contact_id),
+                                values=(contact["name"], contact["phone"], contact.get("email", "")))
+
+        def merge_selected():
+            selected = dup_tree.selection()
+            if not selected:
+                messagebox.showwarning("Warning", "Please select a group to merge.", parent=dup_window)
+                return
+            row = selected[0] if selected[0].startswith("g") else dup_tree.parent(selected[0])
+            if losses[int(row[1:])] and not messagebox.askyesno(
+                "Confirm Merge",
+                "Merging this group loses the values listed under Not kept. Merge anyway?",
+                parent=dup_window
+            ):
+                return
+            self.merge_groups([groups[int(row[1:])]])
+            dup_tree.delete(row)
+
+        def merge_all():
+            lossy = sum(1 for dropped in losses.values() if dropped)
+            if lossy and not messagebox.askyesno(
+                "Confirm Merge",
+                f"Merging loses the values listed under Not kept in {lossy} group(s). Merge anyway?",
+                parent=dup_window
+            ):
+                return
+            self.merge_groups(groups)
+            dup_window.destroy()
+            message = f"Merged {len(groups)} groups of duplicates."
+            if hidden:
+                message += f"\nPress Duplicates again for the other {hidden} groups."
+            messagebox.showinfo("Success", message)
+
+        button_frame = tk.Frame(dup_window, bg="#e6f3ff")
+        button_frame.pack(pady=10)
+
+        merge_btn = tk.Button(
+            button_frame,
+            text="Merge Selected",
+            command=merge_selected,
+            bg="#4CAF50",
+            fg="white",
+            font=("Arial", 12, "bold"),
+            relief=tk.RAISED,
+            bd=2
+        )
+        merge_btn.pack(side=tk.LEFT, padx=10)
+
+        merge_all_btn = tk.Button(
+            button_frame,
+            text="Merge All",
+            command=merge_all,
+            bg="#ffb347",
+            fg="white",
+            font=("Arial", 12, "bold"),
+            relief=tk.RAISED,
+            bd=2
+        )
+        merge_all_btn.pack(side=tk.LEFT, padx=10)
+
+        close_btn = tk.Button(
+            button_frame,
+            text="Close",
+            command=dup_window.destroy,
+            bg="#2d5985",
+            fg="white",
+            font=("Arial", 12),
+            relief=tk.RAISED,
+            bd=2
+        )
+        close_btn.pack(side=tk.LEFT, padx=10)
 
     def delete_contact(self):
-        selected = self.tree.selection()
-        if not selected:
+        contact = self.selected_contact()
+        if not contact:
             messagebox.showwarning("Warning", "Please select a contact to delete.")
             return
 
-        # Get the selected contact name
-        item = self.tree.item(selected[0])
-        name = item["values"][0]
-
         # Confirm deletion
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {name}?"):
-            # Remove from contacts list
-            self.contacts = [c for c in self.contacts if c["name"] != name]
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {contact['name']}?"):
+            # Remove from contacts and the index
+            self.index.remove(contact)
+            del self.contacts[contact["id"]]
 
             # Save and refresh
             self.save_contacts()
-            self.display_contacts()
+            self.tree.delete(str(contact["id"]))
             messagebox.showinfo("Success", "Contact deleted successfully!")
 
 
@@ -1,8 +1,21 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json
-import os
-from datetime import datetime
+from tkinter import ttk, messagebox, filedialog
+import queue
+import threading
+from datetime import date, datetime, time, timedelta
+
+from todo_store import Task, TaskStats, TodoStore, read_task_batches, write_tasks
+
+ROW_HEIGHT = 30
+OVERSCAN_ROWS = 5
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_POLL_MS = 15
+SHARED_POLL_MS = 1000
+LOAD_POLL_MS = 30
+# Upper bound between due-date checks, so sleep or clock changes are caught
+DUE_CHECK_MAX_MS = 60 * 60 * 1000
+IMPORT_POLL_MS = 10
+WRITE_STATUS_MS = 250
 
 
 class TodoApp:
@@ -17,21 +30,153 @@ class TodoApp:
         self.root.title("Colorful To-Do List")
         self.root.geometry("900x700")
         self.root.configure(bg="#f0f4ff")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Wait for queued writes so nothing is lost on exit
+        self.store.close()
+        self.root.destroy()
 
     def load_data(self):
         self.data_file = "todos.json"
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as f:
-                json.dump([], f)
-        try:
-            with open(self.data_file, 'r') as f:
-                self.todos = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            self.todos = []
+        # The store starts empty so the window appears at once; the tasks are
+        # parsed on a loader thread and the first screenful is shown as soon
+        # as it arrives
+        self.store = TodoStore(self.data_file, background=True)
+        self.loading = True
+        self.load_error = None
+        self.loading_stats = TaskStats()
+        self.due_job = None
+        self.write_status_job = None
+        self.importing = False
+        self.load_updates = queue.Queue()
+        threading.Thread(target=self.load_worker, daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_load)
+
+    def load_worker(self):
+        def progress(batch):
+            stats = TaskStats()
+            for task in batch:
+                stats.add(task)
+            self.load_updates.put(("batch", (batch, stats)))
 
-    def save_data(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.todos, f, indent=2)
+        try:
+            self.load_updates.put(("done", self.store.read(progress)))
+        except Exception as e:
+            self.load_updates.put(("error", e))
+
+    def poll_load(self):
+        while not self.load_updates.empty():
+            kind, payload = self.load_updates.get_nowait()
+            if kind == "batch":
+                batch, stats = payload
+                self.loading_stats.merge(stats)
+                if len(self.store.todos) < self.visible_rows() + OVERSCAN_ROWS:
+                    for task in batch[:self.visible_rows() + OVERSCAN_ROWS - len(self.store.todos)]:
+                        self.store.todos[task.id] = task
+                    self.display_todos()
+                self.update_statistics(self.loading_stats)
+            elif kind == "error":
+                # Nothing is written back, so the file stays as it was for the user to fix
+                self.loading = False
+                self.load_error = payload
+                self.store.todos = {}
+                self.display_todos()
+                messagebox.showerror("Error", f"{self.data_file} could not be loaded:\n{payload!r}")
+                return
+            else:
+                self.store.attach(*payload)
+                self.loading = False
+                self.display_todos()
+                if self.store.storage.recovered:
+                    messagebox.showwarning(
+                        "Warning",
+                        f"{self.data_file} could not be read and was moved to {self.store.storage.recovered}"
+                    )
+                self.check_due(notify=False)
+                if self.filters_active():
+                    self.schedule_filter(0)
+                if self.store.shared:
+                    self.root.after(SHARED_POLL_MS, self.poll_shared)
+                return
+        self.root.after(LOAD_POLL_MS, self.poll_load)
+
+    def still_loading(self):
+        if self.load_error is not None:
+            messagebox.showerror("Error", f"Tasks could not be loaded, so they can't be changed:\n{self.load_error!r}")
+            return True
+        if self.loading:
+            messagebox.showinfo("Please wait", "Tasks are still loading.")
+        elif self.importing:
+            messagebox.showinfo("Please wait", "An import is still running.")
+        return self.loading or self.importing
+
+    def save_data(self, *records):
+        # Any search still running was computed against the old tasks
+        self.search_generation += 1
+        if self.store.save(*records):
+            self.show_merged()
+        self.schedule_write_status()
+        # Edits may have moved a due date; only the touched tasks were rescheduled
+        self.schedule_due_check()
+
+    def poll_shared(self):
+        if not self.importing and self.store.poll():
+            self.show_merged()
+        self.root.after(SHARED_POLL_MS, self.poll_shared)
+
+    def show_merged(self):
+        # Tasks changed by other processes are already in the store's index
+        self.search_generation += 1
+        if self.filters_active():
+            self.schedule_filter(0)
+        else:
+            self.display_todos()
+        self.schedule_due_check()
+
+    def schedule_write_status(self):
+        if self.write_status_job is None:
+            self.write_status_job = self.root.after(WRITE_STATUS_MS, self.update_write_status)
+
+    def update_write_status(self):
+        # The writer thread never touches Tk, so its progress is polled here
+        self.write_status_job = None
+        storage = self.store.storage
+        if storage.error is not None:
+            error, storage.error = storage.error, None
+            self.save_label.config(text="Save failed", fg="#d62828")
+            messagebox.showerror("Save Failed", f"Changes could not be written to disk:\n{error}")
+        elif storage.busy():
+            self.save_label.config(text="Saving…", fg="#999999")
+            self.schedule_write_status()
+        elif storage.latency is not None:
+            self.save_label.config(text=f"Saved in {storage.latency * 1000:.1f} ms", fg="#999999")
+
+    def schedule_due_check(self, delay=0, notify=False):
+        if self.due_job is not None:
+            self.root.after_cancel(self.due_job)
+        self.due_job = self.root.after(delay, self.check_due, notify)
+
+    def check_due(self, notify=True):
+        self.due_job = None
+        now = datetime.now()
+        newly_overdue = self.store.index.due.pop_overdue(now.date().toordinal())
+        if newly_overdue:
+            # Only the tags of the rows on screen change
+            self.render_rows()
+            self.overdue_label.config(text=f"Overdue: {len(self.store.index.due.overdue)}")
+            if notify:
+                names = "\n".join("• " + self.store.todos[task_id].text for task_id in newly_overdue[:5])
+                more = f"\n…and {len(newly_overdue) - 5} more" if len(newly_overdue) > 5 else ""
+                messagebox.showinfo("Reminder", f"{len(newly_overdue)} task(s) are now overdue:\n{names}{more}")
+
+        # Wake up when the next due date has passed, i.e. at the following midnight
+        next_due = self.store.index.due.next_due()
+        delay = DUE_CHECK_MAX_MS
+        if next_due is not None:
+            deadline = datetime.combine(date.fromordinal(next_due) + timedelta(days=1), time())
+            delay = min(delay, max(0, int((deadline - now).total_seconds() * 1000)) + 1000)
+        self.schedule_due_check(delay, notify=True)
 
     def create_widgets(self):
         self.create_header()
@@ -184,7 +329,7 @@ class TodoApp:
 
         # Bind filter changes
         for var in [self.filter_priority_var, self.filter_category_var, self.filter_status_var]:
-            var.trace_add("write", lambda *args: self.filter_tasks())
+            var.trace_add("write", lambda *args: self.schedule_filter(0))
 
     def create_right_panel(self):
         right_frame = tk.Frame(self.root, bg="#f0f4ff")
@@ -208,12 +353,12 @@ class TodoApp:
             fg="#333333"
         )
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
-        search_entry.bind("<KeyRelease>", lambda e: self.filter_tasks())
+        search_entry.bind("<KeyRelease>", lambda e: self.schedule_filter())
 
         tk.Button(
             search_frame,
             text="🔍 Search",
-            command=self.filter_tasks,
+            command=lambda: self.schedule_filter(0),
             bg="#5d5dff",
             fg="white",
             font=("Arial", 12, "bold")
@@ -228,6 +373,13 @@ class TodoApp:
             font=("Arial", 12)
         ).pack(side=tk.LEFT, padx=(5, 0))
 
+        # Matching runs on a worker thread; only the newest query is ever shown
+        self.filter_job = None
+        self.search_generation = 0
+        self.search_requests = queue.Queue()
+        self.search_results = queue.Queue()
+        threading.Thread(target=self.search_worker, daemon=True).start()
+
     def create_task_list(self, parent):
         list_frame = tk.Frame(parent, bg="#f0f4ff")
         list_frame.pack(fill=tk.BOTH, expand=True)
@@ -250,8 +402,10 @@ class TodoApp:
             "Status": {"width": 100, "anchor": "center"}
         }
 
+        self.sort_column = "ID"
+        self.sort_reverse = False
         for col, settings in columns.items():
-            self.tree.heading(col, text=col)
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
             self.tree.column(col, **settings)
 
         # Style the Treeview
@@ -261,7 +415,7 @@ class TodoApp:
                         background="#ffffff",
                         fieldbackground="#ffffff",
                         foreground="#333333",
-                        rowheight=30,
+                        rowheight=ROW_HEIGHT,
                         font=("Arial", 11))
         style.configure("Treeview.Heading",
                         background="#5d5dff",
@@ -269,12 +423,32 @@ class TodoApp:
                         font=("Arial", 12, "bold"))
         style.map("Treeview", background=[("selected", "#a8d8ea")])
 
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Configure tag colors
+        self.tree.tag_configure("High", background="#ffeeee")
+        self.tree.tag_configure("Medium", background="#fff9ee")
+        self.tree.tag_configure("Low", background="#eeffee")
+        self.tree.tag_configure("Completed", foreground="#6bd9a7")
+        self.tree.tag_configure("Pending", foreground="#ff6b6b")
+        self.tree.tag_configure("DueToday", background="#fff0b3")
+        self.tree.tag_configure("Overdue", background="#ffc9c9", font=("Arial", 11, "bold"))
+
+        # Add scrollbar. The tree only ever holds the rows in the viewport, so
+        # the scrollbar drives our own offset into the task list instead of yview.
+        self.view = []
+        self.view_offset = 0
+        self.row_cache = {}
+        self.selected_ids = set()
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(fill=tk.BOTH, expand=True)
 
+        self.tree.bind("<Configure>", lambda e: self.render_rows())
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Control-a>", self.select_all)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_mousewheel)
+
     def create_action_buttons(self, parent):
         button_frame = tk.Frame(parent, bg="#f0f4ff")
         button_frame.pack(fill=tk.X, pady=(10, 0))
@@ -282,7 +456,11 @@ class TodoApp:
         buttons = [
             ("✓ Complete", "#6bd9a7", self.mark_complete),
             ("✏️ Edit", "#ffd166", self.edit_task),
-            ("🗑️ Delete", "#ff6b6b", self.delete_task)
+            ("🗑️ Delete", "#ff6b6b", self.delete_task),
+            ("↩️ Undo", "#8ecae6", self.undo),
+            ("↪️ Redo", "#8ecae6", self.redo),
+            ("📥 Import", "#7d9eff", self.import_tasks),
+            ("📤 Export", "#b07dff", self.export_tasks)
         ]
 
         for text, color, command in buttons:
@@ -297,6 +475,10 @@ class TodoApp:
                 bd=3
             ).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        self.root.bind("<Control-Z>", self.redo)
+
     def create_statistics(self, parent):
         stats_frame = tk.LabelFrame(
             parent,
@@ -309,8 +491,11 @@ class TodoApp:
         )
         stats_frame.pack(fill=tk.X, pady=(15, 0))
 
+        counts_frame = tk.Frame(stats_frame, bg="#f0f4ff")
+        counts_frame.pack(fill=tk.X)
+
         self.total_label = tk.Label(
-            stats_frame,
+            counts_frame,
             text="Total: 0",
             bg="#f0f4ff",
             fg="#333333",
@@ -319,7 +504,7 @@ class TodoApp:
         self.total_label.pack(side=tk.LEFT, padx=10, pady=5)
 
         self.completed_label = tk.Label(
-            stats_frame,
+            counts_frame,
             text="Completed: 0",
             bg="#f0f4ff",
             fg="#6bd9a7",
@@ -328,7 +513,7 @@ class TodoApp:
         self.completed_label.pack(side=tk.LEFT, padx=10, pady=5)
 
         self.pending_label = tk.Label(
-            stats_frame,
+            counts_frame,
             text="Pending: 0",
             bg="#f0f4ff",
             fg="#ff6b6b",
@@ -336,80 +521,201 @@ class TodoApp:
         )
         self.pending_label.pack(side=tk.LEFT, padx=10, pady=5)
 
-    def display_todos(self, todos=None):
-        self.tree.delete(*self.tree.get_children())
-        todos_to_display = todos if todos is not None else self.todos
+        self.overdue_label = tk.Label(
+            counts_frame,
+            text="Overdue: 0",
+            bg="#f0f4ff",
+            fg="#d62828",
+            font=("Arial", 11, "bold")
+        )
+        self.overdue_label.pack(side=tk.LEFT, padx=10, pady=5)
 
-        for idx, todo in enumerate(todos_to_display, 1):
-            status = "Completed" if todo.get("completed", False) else "Pending"
-            priority = todo.get("priority", "Medium")
+        # Completed/total per priority and per category
+        self.breakdown_label = tk.Label(
+            stats_frame,
+            text="",
+            bg="#f0f4ff",
+            fg="#666666",
+            font=("Arial", 10),
+            justify=tk.LEFT,
+            anchor="w"
+        )
+        self.breakdown_label.pack(fill=tk.X, padx=10, pady=(0, 5))
 
-            self.tree.insert("", tk.END, values=(
-                idx,
-                todo["task"],
-                priority,
-                todo.get("category", "Personal"),
-                todo.get("due_date", ""),
+        # Latency of the last write, reported by the storage backend
+        self.save_label = tk.Label(
+            stats_frame,
+            text="",
+            bg="#f0f4ff",
+            fg="#999999",
+            font=("Arial", 9),
+            anchor="w"
+        )
+        self.save_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+
+    def display_todos(self, task_ids=None, stats=None):
+        # Filtered views come with their own statistics from the search worker
+        if task_ids is None:
+            task_ids = self.store.index.ordered(self.store.todos, self.sort_column, self.sort_reverse)
+            stats = self.store.index.stats
+        self.view = task_ids
+        if self.selected_ids:
+            # Never act on selected tasks the current filter hides
+            self.selected_ids.intersection_update(self.view)
+        self.render_rows()
+        self.update_statistics(self.loading_stats if self.loading else stats)
+
+    def visible_rows(self):
+        # The heading takes roughly one row of the widget height
+        return max(1, self.tree.winfo_height() // ROW_HEIGHT - 1)
+
+    def render_rows(self):
+        visible = self.visible_rows()
+        total = len(self.view)
+        self.view_offset = max(0, min(self.view_offset, total - visible))
+
+        end = min(total, self.view_offset + visible + OVERSCAN_ROWS)
+        today = date.today().toordinal()
+        overdue = self.store.index.due.overdue
+        rows = []
+        for idx in range(self.view_offset, end):
+            todo = self.store.todos[self.view[idx]]
+            status = "Completed" if todo.completed else "Pending"
+            tags = (todo.priority, status)
+            if todo.id in overdue:
+                tags = ("Overdue",) + tags
+            elif not todo.completed and todo.due_ordinal == today:
+                tags = ("DueToday",) + tags
+
+            rows.append((str(todo.id), (
+                todo.id,
+                todo.text,
+                todo.priority,
+                todo.category,
+                todo.due_date,
                 status
-            ), tags=(priority, status))
-
-        # Configure tag colors
-        self.tree.tag_configure("High", background="#ffeeee")
-        self.tree.tag_configure("Medium", background="#fff9ee")
-        self.tree.tag_configure("Low", background="#eeffee")
-        self.tree.tag_configure("Completed", foreground="#6bd9a7")
-        self.tree.tag_configure("Pending", foreground="#ff6b6b")
-
-        self.update_statistics(todos_to_display)
+            ), tags))
+        self.sync_rows(rows)
+
+        if total:
+            self.scrollbar.set(self.view_offset / total, min(1.0, (self.view_offset + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def sync_rows(self, rows):
+        # Tree items are keyed by task id, so every task that stays on screen
+        # keeps its item and only changed values or positions are touched
+        wanted = {iid for iid, values, tags in rows}
+        stale = [iid for iid in self.row_cache if iid not in wanted]
+        for iid in stale:
+            del self.row_cache[iid]
+        if stale:
+            self.tree.delete(*stale)
+
+        for position, (iid, values, tags) in enumerate(rows):
+            if iid not in self.row_cache:
+                self.tree.insert("", position, iid=iid, values=values, tags=tags)
+                self.row_cache[iid] = (values, tags)
+                continue
+            if self.row_cache[iid] != (values, tags):
+                self.tree.item(iid, values=values, tags=tags)
+                self.row_cache[iid] = (values, tags)
+            if self.tree.index(iid) != position:
+                self.tree.move(iid, "", position)
+
+        # Rows scrolled back into view keep their selection
+        reselect = [iid for iid in self.row_cache if int(iid) in self.selected_ids]
+        if set(reselect) != set(self.tree.selection()):
+            self.tree.selection_set(reselect)
+
+    def on_click(self, event):
+        # A plain click starts a new selection, including rows scrolled out of view
+        if not event.state & 0x0005:
+            self.selected_ids.clear()
+
+    def on_select(self, event=None):
+        # Only the rows on screen can change selection; keep the rest as they are
+        visible = {int(iid) for iid in self.row_cache}
+        selected = {int(iid) for iid in self.tree.selection()}
+        self.selected_ids = (self.selected_ids - visible) | selected
+
+    def select_all(self, event=None):
+        self.selected_ids = set(self.view)
+        self.render_rows()
+        return "break"
+
+    def selected_task_ids(self):
+        return [task_id for task_id in self.selected_ids if task_id in self.store.todos]
+
+    def scroll_to(self, offset):
+        self.view_offset = offset
+        self.render_rows()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.view)))
+        elif action == "scroll":
+            step = self.visible_rows() if unit == "pages" else 1
+            self.scroll_to(self.view_offset + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll_to(self.view_offset + step)
+        return "break"
 
     def add_task(self):
+        if self.still_loading():
+            return
         task = self.task_entry.get().strip()
         if not task:
             messagebox.showwarning("Warning", "Please enter a task description.")
             return
 
-        new_task = {
-            "task": task,
-            "priority": self.priority_var.get(),
-            "category": self.category_var.get(),
-            "due_date": self.due_date_entry.get(),
-            "completed": False,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        new_task = Task(
+            self.store.allocate_ids(1),
+            task,
+            priority=self.priority_var.get(),
+            category=self.category_var.get(),
+            due_date=self.due_date_entry.get(),
+            created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
 
-        self.todos.append(new_task)
-        self.save_data()
+        self.save_data(self.store.put(new_task))
         self.display_todos()
         self.task_entry.delete(0, tk.END)
         messagebox.showinfo("Success", "Task added successfully!")
 
     def mark_complete(self):
-        selected = self.tree.selection()
+        if self.still_loading():
+            return
+        selected = self.selected_task_ids()
         if not selected:
             messagebox.showwarning("Warning", "Please select task(s) to mark as complete.")
             return
 
-        for item in selected:
-            task_idx = self.tree.item(item)["values"][0] - 1
-            if 0 <= task_idx < len(self.todos):
-                self.todos[task_idx]["completed"] = True
-
-        self.save_data()
+        self.save_data(*[
+            self.store.put(self.store.todos[task_id].replace(completed=True)) for task_id in selected
+        ])
         self.display_todos()
         messagebox.showinfo("Success", f"Marked {len(selected)} task(s) as complete!")
 
     def edit_task(self):
-        selected = self.tree.selection()
+        if self.still_loading():
+            return
+        selected = self.selected_task_ids()
         if not selected or len(selected) > 1:
             messagebox.showwarning("Warning", "Please select a single task to edit.")
             return
 
-        task_idx = self.tree.item(selected[0])["values"][0] - 1
-        if 0 <= task_idx < len(self.todos):
-            self.show_edit_window(task_idx)
+        self.show_edit_window(selected[0])
 
-    def show_edit_window(self, task_idx):
-        task = self.todos[task_idx]
+    def show_edit_window(self, task_id):
+        task = self.store.todos[task_id]
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Task")
         edit_window.geometry("400x400")
@@ -428,12 +734,12 @@ class TodoApp:
                  ).grid(row=0, column=0, sticky="w", padx=5, pady=5)
         task_entry = tk.Entry(fields_frame, font=("Arial", 12), bg="#ffffff", fg="#333333")
         task_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-        task_entry.insert(0, task["task"])
+        task_entry.insert(0, task.text)
 
         # Priority
         tk.Label(fields_frame, text="Priority:", bg="#e6f3ff", fg="#333333", font=("Arial", 11)
                  ).grid(row=1, column=0, sticky="w", padx=5, pady=5)
-        priority_var = tk.StringVar(value=task.get("priority", "Medium"))
+        priority_var = tk.StringVar(value=task.priority)
         ttk.Combobox(
             fields_frame,
             textvariable=priority_var,
@@ -447,12 +753,12 @@ class TodoApp:
                  ).grid(row=2, column=0, sticky="w", padx=5, pady=5)
         due_date_entry = tk.Entry(fields_frame, font=("Arial", 12), bg="#ffffff", fg="#333333")
         due_date_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-        due_date_entry.insert(0, task.get("due_date", ""))
+        due_date_entry.insert(0, task.due_date)
 
         # Category
         tk.Label(fields_frame, text="Category:", bg="#e6f3ff", fg="#333333", font=("Arial", 11)
                  ).grid(row=3, column=0, sticky="w", padx=5, pady=5)
-        category_var = tk.StringVar(value=task.get("category", "Personal"))
+        category_var = tk.StringVar(value=task.category)
         ttk.Combobox(
             fields_frame,
             textvariable=category_var,
@@ -464,7 +770,7 @@ class TodoApp:
         # Status
         tk.Label(fields_frame, text="Status:", bg="#e6f3ff", fg="#333333", font=("Arial", 11)
                  ).grid(row=4, column=0, sticky="w", padx=5, pady=5)
-        status_var = tk.BooleanVar(value=task.get("completed", False))
+        status_var = tk.BooleanVar(value=task.completed)
         tk.Checkbutton(
             fields_frame,
             text="Completed",
@@ -481,7 +787,7 @@ class TodoApp:
             button_frame,
             text="Save Changes",
             command=lambda: self.save_edited_task(
-                task_idx,
+                task_id,
                 task_entry.get(),
                 priority_var.get(),
                 due_date_entry.get(),
@@ -503,70 +809,232 @@ class TodoApp:
             font=("Arial", 12)
         ).pack(side=tk.LEFT, padx=10)
 
-    def save_edited_task(self, task_idx, task, priority, due_date, category, completed, window):
+    def save_edited_task(self, task_id, task, priority, due_date, category, completed, window):
         if not task:
             messagebox.showwarning("Warning", "Task description cannot be empty.")
             return
+        if task_id not in self.store.todos:
+            window.destroy()
+            return
 
-        self.todos[task_idx] = {
-            "task": task,
-            "priority": priority,
-            "due_date": due_date,
-            "category": category,
-            "completed": completed,
-            "created_at": self.todos[task_idx]["created_at"]
-        }
-
-        self.save_data()
+        self.save_data(self.store.put(self.store.todos[task_id].replace(
+            text=task,
+            priority=priority,
+            due_date=due_date,
+            category=category,
+            completed=completed
+        )))
         self.display_todos()
         window.destroy()
         messagebox.showinfo("Success", "Task updated successfully!")
 
     def delete_task(self):
-        selected = self.tree.selection()
+        if self.still_loading():
+            return
+        selected = self.selected_task_ids()
         if not selected:
             messagebox.showwarning("Warning", "Please select task(s) to delete.")
             return
 
         if messagebox.askyesno("Confirm Delete", f"Delete {len(selected)} task(s)?"):
-            indices = sorted([self.tree.item(item)["values"][0] - 1 for item in selected], reverse=True)
-            for idx in indices:
-                if 0 <= idx < len(self.todos):
-                    self.todos.pop(idx)
+            records = [self.store.remove(task_id) for task_id in selected]
+            self.selected_ids.difference_update(selected)
 
-            self.save_data()
+            self.save_data(*records)
             self.display_todos()
             messagebox.showinfo("Success", f"Deleted {len(selected)} task(s)!")
 
-    def filter_tasks(self):
-        search_text = self.search_var.get().lower()
-        priority_filter = self.filter_priority_var.get()
-        category_filter = self.filter_category_var.get()
-        status_filter = self.filter_status_var.get()
+    def undo(self, event=None):
+        self.replay(self.store.undo)
+
+    def redo(self, event=None):
+        self.replay(self.store.redo)
+
+    def replay(self, step):
+        if self.still_loading():
+            return
+        records = step()
+        if self.store.conflicts:
+            messagebox.showwarning(
+                "Warning",
+                f"{self.store.conflicts} task(s) were changed elsewhere since, so they were left as they are."
+            )
+        if not records:
+            if not self.store.conflicts:
+                self.root.bell()
+            return
+        self.save_data(*records)
+        self.display_todos()
+
+    def filters_active(self):
+        return bool(self.search_var.get()) or any(
+            var.get() != "All"
+            for var in (self.filter_priority_var, self.filter_category_var, self.filter_status_var)
+        )
+
+    def schedule_filter(self, delay=SEARCH_DEBOUNCE_MS):
+        # Coalesce bursts of keystrokes into one query
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(delay, self.filter_tasks)
+
+    def import_tasks(self):
+        if self.still_loading():
+            return
+        path = filedialog.askopenfilename(
+            title="Import Tasks",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        # Rows are read and validated on a worker thread and ingested here a
+        # batch at a time, without journaling, saving or redrawing per row
+        self.importing = True
+        self.import_count = 0
+        self.import_errors = []
+        self.import_batches = queue.Queue(maxsize=4)
+        self.store.index.drop_orders()
+
+        def read():
+            try:
+                for batch in read_task_batches(path, self.import_errors):
+                    self.import_batches.put(batch)
+                self.import_batches.put(None)
+            except Exception as e:
+                # Anything unexpected still ends the import on the Tk thread
+                self.import_batches.put(e)
+
+        threading.Thread(target=read, daemon=True).start()
+        self.root.after(IMPORT_POLL_MS, self.poll_import)
+
+    def poll_import(self):
+        try:
+            batch = self.import_batches.get_nowait()
+        except queue.Empty:
+            self.root.after(IMPORT_POLL_MS, self.poll_import)
+            return
 
-        filtered_tasks = []
+        if isinstance(batch, list):
+            self.search_generation += 1
+            first_id = self.store.allocate_ids(len(batch))
+            self.store.insert(Task(task_id, *fields) for task_id, fields in enumerate(batch, first_id))
+            self.import_count += len(batch)
+            self.total_label.config(text=f"Importing… {self.import_count}")
+            self.root.after(1, self.poll_import)
+            return
 
-        for task in self.todos:
-            matches = True
+        # One flush and one redraw for the whole import
+        self.store.checkpoint()
+        self.schedule_write_status()
+        self.importing = False
+        self.display_todos()
+        self.schedule_due_check()
+        if isinstance(batch, Exception):
+            messagebox.showerror("Import Failed", f"Imported {self.import_count} task(s) before an error:\n{batch}")
+            return
+        message = f"Imported {self.import_count} task(s)."
+        if self.import_errors:
+            details = "\n".join(f"Line {line}: {reason}" for line, reason in self.import_errors[:5])
+            message += f"\nSkipped {len(self.import_errors)} invalid row(s):\n{details}"
+        messagebox.showinfo("Import Complete", message)
+
+    def export_tasks(self):
+        if self.still_loading():
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Tasks",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl")]
+        )
+        if not path:
+            return
 
-            if search_text and search_text not in task["task"].lower():
-                matches = False
+        # Exports the current view in its current order. Tasks are immutable,
+        # so the worker thread can write them out while the app carries on.
+        tasks = [self.store.todos[task_id] for task_id in self.view]
+        outcome = queue.Queue()
 
-            if priority_filter != "All" and task.get("priority", "Medium") != priority_filter:
-                matches = False
+        def write():
+            try:
+                write_tasks(path, tasks)
+                outcome.put(None)
+            except OSError as e:
+                outcome.put(e)
 
-            if category_filter != "All" and task.get("category", "Personal") != category_filter:
-                matches = False
+        threading.Thread(target=write, daemon=True).start()
+        self.root.after(IMPORT_POLL_MS, self.poll_export, outcome, len(tasks))
 
-            if status_filter != "All":
-                task_status = "Completed" if task.get("completed", False) else "Pending"
-                if status_filter != task_status:
-                    matches = False
+    def poll_export(self, outcome, count):
+        try:
+            error = outcome.get_nowait()
+        except queue.Empty:
+            self.root.after(IMPORT_POLL_MS, self.poll_export, outcome, count)
+            return
+        if error is not None:
+            messagebox.showerror("Export Failed", str(error))
+        else:
+            messagebox.showinfo("Export Complete", f"Exported {count} task(s).")
 
-            if matches:
-                filtered_tasks.append(task)
+    def filter_tasks(self):
+        self.filter_job = None
+        search_text = self.search_var.get().lower()
+        priority_filter = self.filter_priority_var.get()
+        category_filter = self.filter_category_var.get()
+        status_filter = self.filter_status_var.get()
 
-        self.display_todos(filtered_tasks)
+        self.search_generation += 1
+        filters = (priority_filter, category_filter, status_filter, search_text)
+        sort = (self.sort_column, self.sort_reverse)
+        self.search_requests.put((self.search_generation, filters, sort))
+        self.root.after(SEARCH_POLL_MS, self.poll_search, self.search_generation)
+
+    def search_worker(self):
+        while True:
+            generation, filters, sort = self.search_requests.get()
+            # Skip straight to the newest query if more arrived meanwhile
+            while not self.search_requests.empty():
+                generation, filters, sort = self.search_requests.get_nowait()
+
+            def stale():
+                return generation != self.search_generation
+
+            try:
+                # Filters are an intersection of index sets, which are then
+                # laid out in the order of the maintained column ordering
+                matches = self.store.index.query(*filters, cancelled=stale)
+                result = self.store.index.ordered(self.store.todos, *sort, matches=matches, filters=filters)
+                if matches is None:
+                    stats = self.store.index.stats
+                else:
+                    stats = self.store.index.view_stats(matches, filters)
+            except (RuntimeError, KeyError):
+                # The Tk thread changed the tasks underneath us, which also
+                # made this query stale
+                continue
+            if not stale():
+                self.search_results.put((generation, result, stats))
+
+    def poll_search(self, generation):
+        if generation != self.search_generation:
+            # Superseded by a newer query (which polls for itself) or a mutation
+            return
+        while not self.search_results.empty():
+            result_generation, result, stats = self.search_results.get_nowait()
+            if result_generation == generation:
+                self.display_todos(result, stats)
+                return
+        self.root.after(SEARCH_POLL_MS, self.poll_search, generation)
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        for col in self.tree["columns"]:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if col == self.sort_column else ""
+            self.tree.heading(col, text=col + arrow)
+        self.schedule_filter(0)
 
     def clear_search(self):
         self.search_var.set("")
@@ -575,14 +1043,22 @@ class TodoApp:
         self.filter_status_var.set("All")
         self.display_todos()
 
-    def update_statistics(self, tasks):
-        total = len(tasks)
-        completed = sum(1 for task in tasks if task.get("completed", False))
+    def update_statistics(self, stats):
+        total = stats.total
+        completed = stats.completed
         pending = total - completed
 
-        self.total_label.config(text=f"Total: {total}")
+        self.total_label.config(text=f"Total: {total}…" if self.loading else f"Total: {total}")
         self.completed_label.config(text=f"Completed: {completed}")
         self.pending_label.config(text=f"Pending: {pending}")
+        self.overdue_label.config(text=f"Overdue: {len(self.store.index.due.overdue)}")
+
+        lines = []
+        for title, breakdown in (("Priority", stats.by_priority), ("Category", stats.by_category)):
+            parts = [f"{key} {done}/{count}" for key, (count, done) in breakdown.items() if count]
+            if parts:
+                lines.append(f"{title}: " + " · ".join(parts))
+        self.breakdown_label.config(text="\n".join(lines))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+# Measures bulk import/export throughput of todo_store.py without the GUI:
+# streaming + validating rows, ingesting them into the task index, one
+# snapshot flush, and exporting them back out.
+#
+#     python benchmarks/bulk_import.py [number_of_rows]
+
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import todo_store  # noqa: E402
+
+
+def sample_rows(count):
+    rng = random.Random(7)
+    for i in range(count):
+        yield {
+            "task": f"Imported task {i} {rng.randint(0, 10**6)}",
+            "priority": rng.choice(list(todo_store.PRIORITY_RANK)),
+            "category": rng.choice(todo_store.CATEGORIES),
+            "due_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "completed": rng.random() < 0.3,
+            "created_at": "2025-01-01 09:00:00"
+        }
+
+
+def write_samples(directory, count):
+    csv_path = os.path.join(directory, "tasks.csv")
+    with open(csv_path, 'w', newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=todo_store.TRANSFER_FIELDS[1:])
+        writer.writeheader()
+        writer.writerows(sample_rows(count))
+
+    jsonl_path = os.path.join(directory, "tasks.jsonl")
+    with open(jsonl_path, 'w', encoding="utf-8") as f:
+        f.writelines(json.dumps(row) + "\n" for row in sample_rows(count))
+    return csv_path, jsonl_path
+
+
+def run(path, directory, count):
+    todos = {}
+    index = todo_store.TaskIndex()
+    errors = []
+    next_id = 1
+
+    start = time.perf_counter()
+    for batch in todo_store.read_task_batches(path, errors):
+        for fields in batch:
+            task = todo_store.Task(next_id, *fields)
+            todos[task.id] = task
+            index.add(task)
+            next_id += 1
+    ingested = time.perf_counter()
+
+    journal = todo_store.TodoJournal(os.path.join(directory, "todos.json"))
+    journal.checkpoint(todos)
+    journal.compactor.join()
+    flushed = time.perf_counter()
+
+    export_path = os.path.join(directory, "export" + os.path.splitext(path)[1])
+    todo_store.write_tasks(export_path, todos.values())
+    exported = time.perf_counter()
+
+    name = os.path.basename(path)
+    print(f"{name}: {len(todos)} rows, {len(errors)} rejected")
+    print(f"  read + validate + index : {ingested - start:7.2f} s  ({count / (ingested - start):10,.0f} rows/s)")
+    print(f"  snapshot flush          : {flushed - ingested:7.2f} s")
+    print(f"  export                  : {exported - flushed:7.2f} s  ({count / (exported - flushed):10,.0f} rows/s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        for path in write_samples(directory, count):
+            run(path, directory, count)
+
+
+if __name__ == "__main__":
+    main()
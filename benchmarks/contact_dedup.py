@@ -0,0 +1,79 @@
+# Times the contact book's duplicate pass on synthetic books where one contact
+# in ten was entered twice (number written differently, name misspelt the way
+# it sounds, or the same email): indexing the blocking keys, finding the
+# groups, merging them all, and one on-insert duplicate check. No window is opened.
+#
+#     python benchmarks/contact_dedup.py [sizes...]      e.g. 100k 1M (default)
+
+import random
+import sys
+import time
+
+from contact_search import load_contact_book, make_contacts, parse_size, report, timed
+
+SOUND_ALIKE = [("ph", "f"), ("y", "i"), ("ck", "k"), ("th", "t"), ("ee", "ea")]
+
+
+class Tree:
+    # Stands in for the window's Treeview, which merging keeps in step
+    def exists(self, iid):
+        return False
+
+
+def add_duplicates(contact_book, contacts):
+    rng = random.Random(len(contacts))
+    next_id = len(contacts) + 1
+    for original in rng.sample(contacts, len(contacts) // 10):
+        duplicate = dict(original, id=next_id, address="")
+        next_id += 1
+        kind = rng.randrange(3)
+        if kind == 0:
+            duplicate["phone"] = duplicate["digits"][1:4] + "." + duplicate["digits"][4:7] + "." + duplicate["digits"][7:]
+        elif kind == 1:
+            name = duplicate["name"].lower()
+            for old, new in SOUND_ALIKE:
+                name = name.replace(old, new)
+            duplicate["name"] = name.title()
+        else:
+            duplicate["phone"] = f"+44 20 {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}"
+        duplicate["digits"] = contact_book.normalize_phone(duplicate["phone"])
+        contacts.append(duplicate)
+    return contacts
+
+
+def run(contact_book, count):
+    contacts = add_duplicates(contact_book, make_contacts(contact_book, count))
+    book = contact_book.ContactBook.__new__(contact_book.ContactBook)
+    book.contacts = {}
+    book.tree = Tree()
+    book.save_contacts = book.search_contact = lambda: None
+    book.add_loaded(contacts)
+    total = time.perf_counter()
+
+    start = time.perf_counter()
+    duplicates = book.index.duplicate_index(book.contacts)
+    print(f"  {'index blocking keys':<26} {time.perf_counter() - start:9.2f} s    {len(duplicates.blocks):,} keys")
+    start = time.perf_counter()
+    groups = duplicates.groups(book.contacts)
+    print(f"  {'find groups':<26} {time.perf_counter() - start:9.2f} s    {len(groups):,} groups,"
+          f" {sum(len(group) for group in groups):,} contacts")
+
+    rng = random.Random(1)
+    report("on-insert check", timed(lambda: duplicates.matches(rng.choice(contacts)), 1000))
+
+    start = time.perf_counter()
+    book.merge_groups(groups)
+    print(f"  {'merge all + reindex':<26} {time.perf_counter() - start:9.2f} s    {len(book.contacts):,} contacts left")
+    print(f"  {'whole pass':<26} {time.perf_counter() - total:9.2f} s")
+
+
+def main():
+    contact_book = load_contact_book()
+    sizes = [parse_size(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for count in sizes:
+        print(f"{count:,} contacts + {count // 10:,} duplicates")
+        run(contact_book, count)
+
+
+if __name__ == "__main__":
+    main()
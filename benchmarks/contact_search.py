@@ -0,0 +1,145 @@
+# Query latency percentiles of the contact book's searches on synthetic books:
+# type-ahead prefix search (name words, leading or trailing phone digits), and
+# fuzzy search over names and emails with typos.
+# Also times building each index and its peak memory. No window is opened.
+#
+#     python benchmarks/contact_search.py [sizes...]      e.g. 100k 1M (default)
+
+import gc
+import importlib.util
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# CONTACT BOOK.py shares write_atomic with todo_store
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FIRST = ["john", "jane", "maria", "ahmed", "wei", "priya", "olga", "carlos", "fatima", "kenji",
+         "liam", "emma", "noah", "sofia", "lucas", "chloe", "ivan", "aisha", "mateo", "yuki"]
+LAST = ["smith", "garcia", "nguyen", "kowalski", "okafor", "tanaka", "silva", "müller", "patel", "johnson",
+        "brown", "dubois", "rossi", "kim", "ivanova", "haddad", "jensen", "murphy", "novak", "cohen"]
+DOMAINS = ["gmail.com", "example.org", "mail.co.uk", "outlook.com"]
+PREFIX_QUERIES = [("one letter", "j"), ("first name", "maria"), ("two words", "car silv"),
+                  ("phone digits", "1 555 12"), ("last four digits", "4321"), ("no match", "qqq")]
+FUZZY_QUERIES = [("swap", "jhon"), ("missing letter", "smth"), ("two typos", "kowalksy"),
+                 ("two words", "mraia garcai"), ("email", "exmaple"), ("rare surname", None)]
+
+
+def parse_size(text):
+    scale = {"k": 10**3, "m": 10**6}.get(text[-1].lower(), 1)
+    return int(text[:-1] if scale > 1 else text) * scale
+
+
+def load_contact_book():
+    spec = importlib.util.spec_from_file_location(
+        "contact_book", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CONTACT BOOK.py")
+    )
+    contact_book = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(contact_book)
+    return contact_book
+
+
+def surname(rng):
+    # One contact in five gets a made-up surname, so the vocabulary grows with the book
+    if rng.random() < 0.2:
+        return "".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+    return rng.choice(LAST)
+
+
+def make_contacts(contact_book, count):
+    rng = random.Random(count)
+    contacts = []
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST), surname(rng)
+        phone = f"+1 (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+        contacts.append({
+            "id": i,
+            "name": f"{first.title()} {last.title()}",
+            "phone": phone,
+            "digits": contact_book.normalize_phone(phone),
+            "email": f"{first}.{last}{i}@{rng.choice(DOMAINS)}",
+            "address": ""
+        })
+    return contacts
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+
+def report(name, samples, extra=""):
+    samples = sorted(samples)
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+    print(f"  {name:<26} p50 {pick(0.5):9.2f}  p90 {pick(0.9):9.2f}  p99 {pick(0.99):9.2f}  max {samples[-1] * 1000:9.2f} ms{extra}")
+
+
+def run(contact_book, count):
+    contacts = make_contacts(contact_book, count)
+    by_id = {contact["id"]: contact for contact in contacts}
+    limit = contact_book.SEARCH_LIMIT
+    ops = max(20, min(200, 20_000_000 // count))
+
+    def build(name, func):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        # Built again under tracemalloc, which would skew the timing
+        result, peak = peak_memory(func)
+        print(f"  {'build: ' + name:<26} {elapsed:9.2f} s    peak {peak / 2**20:7.1f} MiB")
+        return result
+
+    index = build("prefix index", lambda: contact_book.ContactIndex(contacts))
+    index.fuzzy = build("fuzzy index", lambda: contact_book.FuzzyIndex(contacts))
+    print(f"  {'':<26} {len(index.fuzzy.postings):,} words, {len(index.fuzzy.deletes):,} deletions")
+
+    for name, query in PREFIX_QUERIES:
+        found = len(index.search(query, by_id, limit))
+        report(f"prefix: {name}", timed(lambda: index.search(query, by_id, limit), ops), f"  {found} found")
+
+    rare = min(index.fuzzy.postings, key=lambda term: (len(index.fuzzy.postings[term]), -len(term)))
+    for name, query in FUZZY_QUERIES:
+        # A made-up surname with its last two letters swapped
+        query = query or rare[:-2] + rare[-1] + rare[-2]
+        found = len(index.fuzzy_search(query, by_id, limit))
+        report(f"fuzzy: {name}", timed(lambda: index.fuzzy_search(query, by_id, limit), ops), f"  {found} found")
+
+    rng = random.Random(1)
+
+    def update():
+        contact = by_id[rng.randint(1, count)]
+        index.remove(contact)
+        contact["name"] = f"{rng.choice(FIRST).title()} {surname(rng).title()}"
+        index.add(contact)
+
+    report("update one contact", timed(update, ops))
+
+
+def main():
+    contact_book = load_contact_book()
+    sizes = [parse_size(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for count in sizes:
+        print(f"{count:,} contacts")
+        run(contact_book, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# Latency percentiles and peak memory of the to-do list's hot paths on
+# synthetic stores: loading, saving an edit, filtering, ordering the view and
+# statistics. When a display is available the real TodoApp is also driven
+# (display_todos, sorting, update_statistics); without one that part is
+# skipped, so the suite runs fine on a headless machine.
+#
+#     python benchmarks/hot_paths.py [sizes...]      e.g. 1k 100k 1M (default)
+
+import gc
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import todo_store  # noqa: E402
+
+QUERIES = [
+    ("priority", ("High", "All", "All", "")),
+    ("category + status", ("All", "Work", "Pending", "")),
+    ("search", ("All", "All", "All", "report 12")),
+    ("short search", ("All", "All", "All", "9")),
+    ("everything", ("Low", "Study", "Completed", "task")),
+]
+WORDS = ["report", "call", "email", "review", "plan", "buy", "fix", "write", "read", "task"]
+
+
+def parse_size(text):
+    scale = {"k": 10**3, "m": 10**6}.get(text[-1].lower(), 1)
+    return int(text[:-1] if scale > 1 else text) * scale
+
+
+def write_store(directory, count):
+    rng = random.Random(count)
+    tasks = [
+        {
+            "id": i,
+            "task": f"{rng.choice(WORDS)} {i} {rng.choice(WORDS)}",
+            "priority": rng.choice(list(todo_store.PRIORITY_RANK)),
+            "category": rng.choice(todo_store.CATEGORIES),
+            "due_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else "",
+            "completed": rng.random() < 0.3,
+            "created_at": "2025-01-01 09:00:00"
+        }
+        for i in range(1, count + 1)
+    ]
+    path = os.path.join(directory, "todos.json")
+    todo_store.write_atomic(path, json.dumps(tasks, indent=2).encode())
+    return path
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def report(name, samples, peak=None):
+    samples = sorted(samples)
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+    line = f"  {name:<26} p50 {pick(0.5):9.2f}  p90 {pick(0.9):9.2f}  p99 {pick(0.99):9.2f}  max {samples[-1] * 1000:9.2f} ms"
+    if peak is not None:
+        line += f"  peak {peak / 2**20:7.1f} MiB"
+    print(line)
+
+
+def run_store(path, count):
+    # Fewer repetitions as the store grows, so a 1M run stays bearable
+    repeat = max(3, min(50, 200_000 // count))
+    ops = max(20, min(500, 2_000_000 // count))
+
+    report("load", timed(lambda: todo_store.TodoStore(path).load().close(), repeat),
+           peak_memory(lambda: todo_store.TodoStore(path).load().close()))
+    store = todo_store.TodoStore(path).load()
+    task_ids = list(store.todos)
+    rng = random.Random(1)
+
+    def edit():
+        task = store.todos[rng.choice(task_ids)]
+        store.save(store.put(task.replace(completed=not task.completed)))
+
+    report("save (one edit)", timed(edit, ops), peak_memory(edit))
+    store.flush()
+
+    def snapshot():
+        store.checkpoint()
+        store.storage.compactor.join()
+
+    report("snapshot", timed(snapshot, repeat), peak_memory(snapshot))
+
+    for name, filters in QUERIES:
+        report(f"filter: {name}", timed(lambda: store.query(*filters), ops), peak_memory(lambda: store.query(*filters)))
+
+    for column in todo_store.SORT_KEYS:
+        store.index.drop_orders()
+        cold = timed(lambda: store.query(sort=column), 1)
+        warm = timed(lambda: store.query(sort=column), ops)
+        report(f"order: {column} (cold)", cold)
+        report(f"order: {column} (warm)", warm, peak_memory(lambda: store.query(sort=column, reverse=True)))
+
+    report("stats: whole list", timed(store.stats, ops), peak_memory(store.stats))
+    report("stats: filtered view", timed(lambda: store.stats("All", "Work", "Pending", ""), ops),
+           peak_memory(lambda: store.stats("All", "Work", "Pending", "")))
+    store.close()
+
+
+def run_window(directory, count):
+    # The real Treeview, only where Tk can open a display
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"  window                     skipped ({e.__class__.__name__}: no display)")
+        return
+    root.withdraw()
+
+    spec = importlib.util.spec_from_file_location(
+        "todo_list", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TO DO LIST 3.py")
+    )
+    todo_list = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(todo_list)
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        start = time.perf_counter()
+        app = todo_list.TodoApp(root)
+        while app.loading:
+            root.update()
+            time.sleep(0.005)
+        report("window: load until ready", [time.perf_counter() - start])
+
+        ops = max(20, min(200, 2_000_000 // count))
+
+        def display():
+            app.display_todos()
+            root.update_idletasks()
+
+        def sort():
+            app.sort_by("Priority")
+            root.update_idletasks()
+
+        report("window: display_todos", timed(display, ops), peak_memory(display))
+        report("window: sort by column", timed(sort, ops))
+        report("window: update_statistics", timed(lambda: app.update_statistics(app.store.index.stats), ops))
+        app.on_close()
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    sizes = [parse_size(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_store(directory, count)
+            print(f"{count:,} tasks ({os.path.getsize(path) / 2**20:.1f} MiB on disk)")
+            run_store(path, count)
+            run_window(directory, count)
+
+
+if __name__ == "__main__":
+    main()
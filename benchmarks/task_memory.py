@@ -0,0 +1,55 @@
+# Compares the memory held by the old per-task dict layout with the slotted
+# Task records used by todo_store.py.
+#
+#     python benchmarks/task_memory.py [number_of_tasks]
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import todo_store  # noqa: E402
+
+PRIORITIES = ["High", "Medium", "Low"]
+CATEGORIES = ["Personal", "Work", "Study", "Health", "Finance", "Other"]
+
+
+def sample_rows(count):
+    # Every string is built fresh, the way json.load hands them back
+    rng = random.Random(42)
+    for i in range(1, count + 1):
+        yield {
+            "id": i,
+            "task": f"Task number {i} {rng.random():.6f}",
+            "priority": "".join(rng.choice(PRIORITIES)),
+            "category": "".join(rng.choice(CATEGORIES)),
+            "due_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "completed": rng.random() < 0.3,
+            "created_at": f"2025-01-01 12:{i % 60:02d}:{i % 60:02d}"
+        }
+
+
+def measure(build, count):
+    tracemalloc.start()
+    tasks = build(sample_rows(count))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tasks
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    as_dicts = measure(lambda rows: {row["id"]: row for row in rows}, count)
+    as_tasks = measure(lambda rows: {row["id"]: todo_store.Task.from_dict(row) for row in rows}, count)
+
+    print(f"{count} tasks")
+    print(f"  dict records : {as_dicts / 2**20:8.1f} MiB ({as_dicts / count:.0f} B/task)")
+    print(f"  Task records : {as_tasks / 2**20:8.1f} MiB ({as_tasks / count:.0f} B/task)")
+    print(f"  reduction    : {100 * (1 - as_tasks / as_dicts):8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
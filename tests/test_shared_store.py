@@ -0,0 +1,76 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import todo_store  # noqa: E402
+from todo_store import Task, TodoStore  # noqa: E402
+
+
+class SharedStoreTest(unittest.TestCase):
+    # Two stores in one process stand in for two processes sharing todos.json
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, "todos.json")
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        shutil.rmtree(self.directory)
+
+    def open_store(self):
+        store = TodoStore(self.data_file, shared=True).load()
+        self.stores.append(store)
+        return store
+
+    def import_tasks(self, store, texts):
+        # What TodoApp.poll_import does: put without saving, then one checkpoint
+        first_id = store.allocate_ids(len(texts))
+        for task_id, text in enumerate(texts, first_id):
+            store.put(Task(task_id, text))
+        store.checkpoint()
+
+    def test_checkpoint_then_poll_and_rollover(self):
+        a, b = self.open_store(), self.open_store()
+        a.add("one")
+        a.add("two")
+        self.import_tasks(a, ["three", "four", "five"])
+
+        self.assertTrue(b.poll())
+        self.assertEqual(sorted(task.text for task in b.todos.values()), ["five", "four", "one", "three", "two"])
+
+        b.add("six")
+        b.checkpoint()
+        on_disk = TodoStore(self.data_file).load()
+        self.stores.append(on_disk)
+        self.assertEqual(len(on_disk.todos), 6)
+
+    def test_second_checkpoint_is_followed(self):
+        a, b = self.open_store(), self.open_store()
+        self.import_tasks(a, ["one", "two"])
+        b.poll()
+        self.import_tasks(a, ["three"])
+        b.poll()
+        self.assertEqual(sorted(b.todos), [1, 2, 3])
+        self.assertEqual(sorted(b.query()), sorted(a.query()))
+
+    def test_rollover_is_followed_through_previous_journal(self):
+        a, b = self.open_store(), self.open_store()
+        compact_every, todo_store.JOURNAL_COMPACT_EVERY = todo_store.JOURNAL_COMPACT_EVERY, 3
+        try:
+            for text in ["one", "two", "three", "four"]:
+                a.add(text)
+        finally:
+            todo_store.JOURNAL_COMPACT_EVERY = compact_every
+        resync = b.storage.resync
+        b.storage.resync = lambda todos: self.fail("followed .prev, no resync needed")
+        b.poll()
+        b.storage.resync = resync
+        self.assertEqual(sorted(b.todos), [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
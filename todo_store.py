@@ -0,0 +1,1663 @@
+# Headless core of the to-do list: tasks, their storage backends and indexes,
+# with no Tk anywhere, so scripts and benchmarks can use the same store as the
+# window in "TO DO LIST 3.py". Also runs as a command line tool:
+#
+#     python todo_store.py add "Pay rent" --priority High --due 2025-07-01
+#     python todo_store.py complete --category Work --status Pending
+#     python todo_store.py query --search rent --sort "Due Date"
+#     python todo_store.py stats
+
+import argparse
+import bisect
+import codecs
+import contextlib
+import csv
+import functools
+import heapq
+import json
+import os
+import queue
+import re
+import sqlite3
+import stat
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from datetime import date, datetime
+from time import perf_counter
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+JOURNAL_COMPACT_EVERY = 1000
+# Journal appends within this window share one fsync (0 syncs every append)
+JOURNAL_SYNC_MS = 50
+# "json" keeps todos.json plus its journal; "sqlite" uses todos.db instead
+STORAGE_BACKEND = os.environ.get("TODO_STORAGE", "json")
+SQLITE_CACHE_SIZE = 1024
+# Set TODO_SHARED=1 in every process that opens the same store at once
+SHARED_STORE = os.environ.get("TODO_SHARED") == "1"
+SNAPSHOT_CHUNK_SIZE = 1 << 20
+SNAPSHOT_SEPARATORS = re.compile(r"[\s,\[]*")
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+CATEGORIES = ["Personal", "Work", "Study", "Health", "Finance", "Other"]
+NO_DUE_DATE = date.max.toordinal() + 1
+IMPORT_BATCH_SIZE = 10000
+# Undo history: at most this many actions, holding at most this many task changes
+UNDO_DEPTH = 100
+UNDO_MAX_CHANGES = 1_000_000
+TRANSFER_FIELDS = ("id", "task", "priority", "category", "due_date", "completed", "created_at")
+# Read once at import: os.umask can only be read by setting it, which is not
+# safe once other threads may be creating files
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def write_atomic(path, data):
+    # Write to a temp file beside `path`, fsync it and rename it over the
+    # original, so a crash leaves either the old or the new file, never half of one
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp makes the file private (0600); keep the permissions the
+        # replaced file had, or those a plain open() would have given it
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(tmp_file, mode)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    fsync_directory(directory)
+
+
+def fsync_directory(directory):
+    # Makes a rename durable; Windows has no directory handles to sync
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def quarantine(path):
+    # Move an unreadable data file aside instead of overwriting it with an
+    # empty list, and return where it went
+    corrupt_file = path + ".corrupt-" + datetime.now().strftime("%Y%m%d%H%M%S")
+    os.replace(path, corrupt_file)
+    return corrupt_file
+
+
+class FileLock:
+    # Advisory lock held around every shared-store read and write: flock on
+    # POSIX, msvcrt.locking on Windows. The lock file also holds the next
+    # free task id for the whole store
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT), 'r+b')
+        if os.name == "nt":
+            while True:
+                try:
+                    # LK_LOCK gives up after ten seconds; keep waiting
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if os.name == "nt":
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+        self.handle = None
+
+    def read_counter(self):
+        self.handle.seek(0)
+        try:
+            return int(self.handle.read() or 0)
+        except ValueError:
+            return 0
+
+    def write_counter(self, value):
+        self.handle.seek(0)
+        self.handle.truncate()
+        self.handle.write(str(value).encode())
+        self.handle.flush()
+
+
+@functools.lru_cache(maxsize=4096)
+def due_ordinal(due_date):
+    # Day number of a YYYY-MM-DD due date, or None when it is not a date
+    try:
+        return date.fromisoformat(due_date).toordinal()
+    except ValueError:
+        return None
+
+
+class Task:
+    # One todo item. Slots instead of a per-task dict, and the priority,
+    # category and due date strings are interned so tasks share one copy.
+    # Tasks are never changed in place: replace() returns an updated copy,
+    # which lets snapshots and views share task objects safely.
+    __slots__ = ("id", "text", "priority", "category", "due_date", "due_ordinal", "completed", "created_at")
+
+    def __init__(self, task_id, text, priority="Medium", category="Personal", due_date="",
+                 completed=False, created_at=""):
+        self.id = task_id
+        self.text = text
+        self.priority = sys.intern(priority)
+        self.category = sys.intern(category)
+        self.due_date = sys.intern(due_date)
+        self.due_ordinal = due_ordinal(due_date)
+        self.completed = bool(completed)
+        self.created_at = created_at
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["id"],
+            data["task"],
+            data.get("priority", "Medium"),
+            data.get("category", "Personal"),
+            data.get("due_date", ""),
+            data.get("completed", False),
+            data.get("created_at", "")
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "task": self.text,
+            "priority": self.priority,
+            "category": self.category,
+            "due_date": self.due_date,
+            "completed": self.completed,
+            "created_at": self.created_at
+        }
+
+    def replace(self, **changes):
+        fields = {
+            "task_id": self.id,
+            "text": self.text,
+            "priority": self.priority,
+            "category": self.category,
+            "due_date": self.due_date,
+            "completed": self.completed,
+            "created_at": self.created_at
+        }
+        fields.update(changes)
+        return Task(**fields)
+
+
+# Sort key of each task list column; ties are broken by task id
+SORT_KEYS = {
+    "ID": lambda task: task.id,
+    "Task": lambda task: task.text.lower(),
+    "Priority": lambda task: PRIORITY_RANK.get(task.priority, len(PRIORITY_RANK)),
+    "Category": lambda task: task.category,
+    "Due Date": lambda task: NO_DUE_DATE if task.due_ordinal is None else task.due_ordinal,
+    "Status": lambda task: task.completed
+}
+
+
+def read_task_rows(path):
+    # Yields (line number, row) from a .csv or JSON Lines file, streaming it;
+    # utf-8-sig drops the byte order mark Excel and Notepad put at the start
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    else:
+        with open(path, encoding="utf-8-sig") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield number, None
+
+
+def validate_task_row(row):
+    # Returns the Task fields (without id) of an imported row or raises ValueError
+    if not isinstance(row, dict):
+        raise ValueError("not a task record")
+    for field in ("priority", "category", "due_date"):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            raise ValueError(f"{field} is not text: {row[field]!r}")
+    text = str(row.get("task") or "").strip()
+    if not text:
+        raise ValueError("missing task description")
+    priority = row.get("priority") or "Medium"
+    if priority not in PRIORITY_RANK:
+        raise ValueError(f"unknown priority {priority!r}")
+    category = row.get("category") or "Personal"
+    if category not in CATEGORIES:
+        raise ValueError(f"unknown category {category!r}")
+    due_date = str(row.get("due_date") or "").strip()
+    if due_date and due_ordinal(due_date) is None:
+        raise ValueError(f"invalid due date {due_date!r}")
+    completed = row.get("completed", False)
+    if isinstance(completed, str):
+        flag = completed.strip().lower()
+        if flag in ("true", "1", "yes", "completed"):
+            completed = True
+        elif flag in ("false", "0", "no", "pending", ""):
+            completed = False
+        else:
+            raise ValueError(f"invalid completed flag {completed!r}")
+    return text, priority, category, due_date, bool(completed), str(row.get("created_at") or "")
+
+
+def read_task_batches(path, errors, batch_size=IMPORT_BATCH_SIZE):
+    # Validated rows in lists of batch_size; rejected rows go to `errors`
+    # as (line number, reason)
+    batch = []
+    for number, row in read_task_rows(path):
+        try:
+            batch.append(validate_task_row(row))
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_tasks(path, tasks):
+    with open(path, 'w', newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            writer = csv.writer(f)
+            writer.writerow(TRANSFER_FIELDS)
+            writer.writerows(
+                (task.id, task.text, task.priority, task.category, task.due_date, task.completed, task.created_at)
+                for task in tasks
+            )
+        else:
+            f.writelines(json.dumps(task.to_dict()) + "\n" for task in tasks)
+
+
+class TodoJournal:
+    # Append-only log of task mutations layered over the todos.json snapshot.
+    # Every mutation costs one compact line of I/O; the snapshot is only
+    # rewritten (in the background) once JOURNAL_COMPACT_EVERY records pile up.
+    #
+    # In shared mode several processes use the same files: every read and
+    # write happens under a FileLock, appends are synchronous, and each
+    # process follows the journal from the byte offset it has read up to.
+    # Compactions start a new journal whose "epoch" header counts them, so a
+    # reader can tell whether it may carry on from .prev or has to resync.
+    def __init__(self, data_file, shared=False):
+        self.data_file = data_file
+        self.journal_file = data_file + ".journal"
+        self.rotated_file = data_file + ".journal.old"
+        self.previous_file = data_file + ".journal.prev"
+        self.handle = None
+        self.records = 0
+        self.compactor = None
+        self.sync_lock = threading.Lock()
+        self.sync_timer = None
+        self.latency = None
+        self.error = None
+        # Where an unreadable snapshot was moved to during load, if anywhere
+        self.recovered = None
+        # Highest id the store has ever held, deleted tasks included
+        self.high_water = 0
+
+        self.shared = shared
+        self.lock = FileLock(data_file + ".lock") if shared else contextlib.nullcontext()
+        self.epoch = 0
+        self.offset = 0
+        self.seen = None
+        # Changes by other processes picked up while appending our own
+        self.changes = []
+
+    def load(self, progress=None):
+        with self.lock:
+            if not os.path.exists(self.data_file):
+                write_atomic(self.data_file, b"[]")
+            try:
+                todos, journals = self.read_state(progress)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Keep the damaged snapshot for the user; the journals are still
+                # replayed so recent changes survive
+                self.recovered = quarantine(self.data_file)
+                write_atomic(self.data_file, b"[]")
+                todos, journals = self.read_state(progress)
+
+            if os.path.exists(self.rotated_file):
+                # An earlier compaction was interrupted, fold everything now
+                epoch = self.next_epoch()
+                self.compact(list(todos.values()), journals)
+                if self.shared:
+                    self.start_epoch(epoch)
+                else:
+                    self.keep_high_water(todos)
+            else:
+                self.records = len(self.read_records(self.journal_file))
+
+            if self.shared:
+                if self.journal_epoch(self.journal_file) is None:
+                    # A missing or header-less journal is folded in first, so
+                    # every journal other processes follow carries an epoch
+                    self.rollover(todos, keep_previous=False)
+                self.epoch = self.journal_epoch(self.journal_file)
+                self.offset = self.read_from(self.journal_file, 0)[1]
+                self.seen = self.stat_journal()
+        return todos
+
+    def read_state(self, progress=None):
+        todos, snapshot_crc = self.read_snapshot(progress)
+        self.high_water = max(self.high_water, max(todos, default=0))
+
+        # A journal that ends with a "compacted" marker for the snapshot on
+        # disk is already folded into it; anything else still has to be replayed.
+        journals = [p for p in (self.rotated_file, self.journal_file) if os.path.exists(p)]
+        for path in journals:
+            records = self.read_records(path)
+            self.raise_high_water(records)
+            if records and records[-1].get("op") == "compacted" and records[-1].get("crc") == snapshot_crc:
+                continue
+            for record in records:
+                self.apply(todos, record)
+        return todos, journals
+
+    def read_snapshot(self, progress=None):
+        # Parses the task list incrementally, handing every chunk's tasks to
+        # `progress` as soon as they are decoded, and returns the tasks with
+        # the crc of the whole file
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder("utf-8")()
+        todos = {}
+        crc = 0
+        buffer, pos, closed = "", 0, False
+        with open(self.data_file, 'rb') as f:
+            while True:
+                chunk = f.read(SNAPSHOT_CHUNK_SIZE)
+                crc = zlib.crc32(chunk, crc)
+                if closed:
+                    if not chunk:
+                        break
+                    continue
+
+                buffer = buffer[pos:] + text.decode(chunk, final=not chunk)
+                pos = 0
+                batch = []
+                while True:
+                    pos = SNAPSHOT_SEPARATORS.match(buffer, pos).end()
+                    if pos == len(buffer):
+                        break
+                    if buffer[pos] == "]":
+                        closed = True
+                        break
+                    try:
+                        task, pos = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        if not chunk:
+                            raise
+                        # The task continues in the next chunk
+                        break
+                    # Snapshots written before tasks had ids get them by position,
+                    # which stays deterministic until a compaction persists them
+                    task.setdefault("id", len(todos) + 1)
+                    task = Task.from_dict(task)
+                    todos[task.id] = task
+                    batch.append(task)
+
+                if batch and progress is not None:
+                    progress(batch)
+                if not chunk:
+                    if not closed:
+                        raise json.JSONDecodeError("Unterminated task list", buffer, pos)
+                    break
+        return todos, crc
+
+    def create_index(self, todos):
+        index = TaskIndex()
+        for task in todos.values():
+            index.add(task)
+        return index
+
+    def max_id(self, todos):
+        # Ids of deleted tasks are never handed out again
+        return max(self.high_water, max(todos, default=0))
+
+    def raise_high_water(self, records):
+        for record in records:
+            task_id = record["task"]["id"] if record.get("op") == "put" else record.get("id")
+            if isinstance(task_id, int) and task_id > self.high_water:
+                self.high_water = task_id
+
+    def keep_high_water(self, todos):
+        # Called once the journal has been moved aside for compaction: the
+        # snapshot drops deleted tasks, so the new journal opens with the
+        # highest id whenever the snapshot alone would no longer show it
+        if self.high_water > max(todos, default=0):
+            self.write([{"op": "high_water", "id": self.high_water}])
+            self.sync()
+
+    def read_records(self, path):
+        records = []
+        if not os.path.exists(path):
+            return records
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn write left behind by a crash
+                    continue
+        return records
+
+    @staticmethod
+    def apply(todos, record):
+        op = record.get("op")
+        if op == "put":
+            todos[record["task"]["id"]] = Task.from_dict(record["task"])
+        elif op == "delete":
+            todos.pop(record["id"], None)
+
+    def append(self, records, todos):
+        if self.shared:
+            self.append_shared(records, todos)
+            return
+        started = perf_counter()
+        self.write(records)
+        self.schedule_sync()
+        self.latency = perf_counter() - started
+
+        if self.records >= JOURNAL_COMPACT_EVERY and not self.compacting():
+            self.start_compaction(todos)
+
+    def write(self, records):
+        if self.handle is None:
+            self.handle = open(self.journal_file, 'a')
+            if self.handle.tell():
+                # Never glue a record onto a torn tail
+                self.handle.write("\n")
+        self.handle.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        self.handle.flush()
+        self.records += len(records)
+        self.raise_high_water(records)
+
+    def schedule_sync(self):
+        # Group commit: every record appended within JOURNAL_SYNC_MS is made
+        # durable by the same fsync
+        if JOURNAL_SYNC_MS <= 0:
+            self.sync()
+        elif self.sync_timer is None:
+            self.sync_timer = threading.Timer(JOURNAL_SYNC_MS / 1000, self.sync)
+            self.sync_timer.daemon = True
+            self.sync_timer.start()
+
+    def sync(self):
+        with self.sync_lock:
+            # Cleared before syncing, so a record appended meanwhile arms a new timer
+            self.sync_timer = None
+            if self.handle is not None:
+                os.fsync(self.handle.fileno())
+
+    def flush(self):
+        self.sync()
+
+    def busy(self):
+        # A compaction still running may yet fail, so the status poll waits for it
+        return self.compacting()
+
+    def checkpoint(self, todos):
+        # Fold everything into a fresh snapshot, e.g. after a bulk import
+        # that was never journaled row by row
+        if self.shared:
+            with self.lock:
+                self.changes.extend(self.catch_up(todos))
+                # The snapshot holds rows no journal has, so nobody may follow on
+                self.rollover(todos, keep_previous=False)
+            return
+        if self.compacting():
+            self.compactor.join()
+        self.close()
+        if os.path.exists(self.journal_file):
+            self.rotate()
+        self.records = 0
+        self.keep_high_water(todos)
+        journals = [self.rotated_file] if os.path.exists(self.rotated_file) else []
+        self.compactor = threading.Thread(
+            target=self.compact_in_background,
+            args=(list(todos.values()), journals),
+            daemon=True
+        )
+        self.compactor.start()
+
+    def compacting(self):
+        return self.compactor is not None and self.compactor.is_alive()
+
+    def start_compaction(self, todos):
+        # Records are never mutated in place, so a shallow copy is a consistent snapshot
+        self.close()
+        self.rotate()
+        self.records = 0
+        self.keep_high_water(todos)
+        self.compactor = threading.Thread(
+            target=self.compact_in_background,
+            args=(list(todos.values()), [self.rotated_file]),
+            daemon=True
+        )
+        self.compactor.start()
+
+    def rotate(self):
+        # Moves the journal aside for compaction. One left behind by a failed
+        # compaction still holds records the snapshot lacks, so the journal
+        # is added to its end instead of replacing it
+        if not os.path.exists(self.rotated_file):
+            os.replace(self.journal_file, self.rotated_file)
+            return
+        with open(self.journal_file, 'rb') as src, open(self.rotated_file, 'ab') as dst:
+            dst.write(b"\n" + src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(self.journal_file)
+
+    def compact_in_background(self, todos, journals):
+        # An exception on the compactor thread would only be printed; keep it
+        # for the status poll like any other failed write. The journals stay
+        # behind for the next compaction, or load(), to fold in
+        try:
+            self.compact(todos, journals)
+        except Exception as e:
+            self.error = e
+
+    def compact(self, todos, journals, remove=True):
+        data = json.dumps([task.to_dict() for task in sorted(todos, key=lambda task: task.id)], indent=2).encode()
+        marker = json.dumps({"op": "compacted", "crc": zlib.crc32(data)}, separators=(",", ":"))
+        for path in journals:
+            with open(path, 'a') as f:
+                f.write("\n" + marker + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+        write_atomic(self.data_file, data)
+        if remove:
+            for path in journals:
+                os.remove(path)
+
+    def append_shared(self, records, todos):
+        # Synchronous on purpose: the lock is held from catching up until our
+        # records are on disk, so no other process can slip in between
+        started = perf_counter()
+        with self.lock:
+            touched = {r["task"]["id"] if r["op"] == "put" else r["id"] for r in records}
+            self.changes.extend(self.catch_up(todos, touched))
+            data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode()
+            with open(self.journal_file, 'ab') as f:
+                if f.tell() != self.offset:
+                    # Never glue a record onto a torn tail
+                    data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                self.offset = f.tell()
+            self.records += len(records)
+            self.raise_high_water(records)
+            if self.records >= JOURNAL_COMPACT_EVERY:
+                self.rollover(todos)
+            self.seen = self.stat_journal()
+        self.latency = perf_counter() - started
+
+    def poll(self, todos):
+        # An idle poll costs one stat; the journal is only read once it changed.
+        # Returns the (old, new) task pairs other processes replaced
+        if self.stat_journal() == self.seen and not self.changes:
+            return []
+        with self.lock:
+            changes = self.changes + self.catch_up(todos)
+            self.changes = []
+            self.seen = self.stat_journal()
+        return changes
+
+    def catch_up(self, todos, skip=()):
+        # Applies what other processes appended since we last looked; ids in
+        # `skip` are about to be overwritten by our own, newer records
+        epoch = self.journal_epoch(self.journal_file)
+        if epoch == self.epoch and (self.stat_journal() or (0,))[0] >= self.offset:
+            records, self.offset = self.read_from(self.journal_file, self.offset)
+            self.records += len(records)
+        elif self.epoch is not None and epoch == self.epoch + 1 and self.journal_epoch(self.previous_file) == self.epoch:
+            # Someone compacted: finish the old journal, then start on the new one
+            records, _ = self.read_from(self.previous_file, self.offset)
+            newer, self.offset = self.read_from(self.journal_file, 0)
+            records += newer
+            self.records = len(newer)
+            self.epoch = epoch
+        else:
+            return self.resync(todos)
+
+        changes = []
+        for record in records:
+            op = record.get("op")
+            if op == "put" and record["task"]["id"] not in skip:
+                task = Task.from_dict(record["task"])
+                changes.append((todos.get(task.id), task))
+                todos[task.id] = task
+            elif op == "delete" and record.get("id") in todos and record["id"] not in skip:
+                changes.append((todos.pop(record["id"]), None))
+        return changes
+
+    def resync(self, todos):
+        # Too far behind to follow the journals: reread the store and diff it
+        # against what we have
+        fresh, _ = self.read_state()
+        self.epoch = self.journal_epoch(self.journal_file)
+        records, self.offset = self.read_from(self.journal_file, 0)
+        self.records = len(records)
+
+        changes = []
+        for task_id in set(todos) | set(fresh):
+            old, new = todos.get(task_id), fresh.get(task_id)
+            if old is not None and new is not None and old.to_dict() == new.to_dict():
+                continue
+            changes.append((old, new))
+            if new is None:
+                del todos[task_id]
+            else:
+                todos[task_id] = new
+        return changes
+
+    def rollover(self, todos, keep_previous=True):
+        # Shared stores compact synchronously under the lock. The folded
+        # journal is kept as .prev so that readers part-way through it can
+        # finish it before moving on to the next epoch
+        epoch = self.next_epoch()
+        if os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.rotated_file)
+            self.compact(list(todos.values()), [self.rotated_file], remove=not keep_previous)
+            if keep_previous:
+                os.replace(self.rotated_file, self.previous_file)
+        else:
+            self.compact(list(todos.values()), [])
+        self.start_epoch(epoch)
+
+    def next_epoch(self):
+        epochs = (self.journal_epoch(p) for p in (self.journal_file, self.rotated_file, self.previous_file))
+        return max((epoch for epoch in epochs if epoch is not None), default=0) + 1
+
+    def start_epoch(self, epoch):
+        header = json.dumps({"op": "epoch", "epoch": epoch}, separators=(",", ":")) + "\n"
+        write_atomic(self.journal_file, header.encode())
+        self.epoch = epoch
+        self.offset = len(header)
+        self.records = 0
+
+    def reserve_ids(self, count, floor):
+        # The lock file doubles as the store-wide id counter, so two processes
+        # adding at once never hand out the same id
+        with self.lock:
+            first = max(floor, self.lock.read_counter())
+            self.lock.write_counter(first + count)
+        return first
+
+    def stat_journal(self):
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def journal_epoch(path):
+        # Shared journals start with an {"op": "epoch"} header. None for a
+        # missing file or one without a header, which must never pass for a
+        # real epoch: a checkpoint removes .prev, and a reader still on that
+        # epoch has to resync rather than follow a file that is gone
+        try:
+            with open(path, 'rb') as f:
+                record = json.loads(f.readline())
+        except (FileNotFoundError, ValueError):
+            return None
+        return record.get("epoch") if isinstance(record, dict) and record.get("op") == "epoch" else None
+
+    @staticmethod
+    def read_from(path, offset):
+        # Complete records written after `offset`, and the offset they end at
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, offset + end
+
+    def close(self):
+        # A background compaction is left to finish rather than killed on exit
+        if self.compacting():
+            self.compactor.join()
+        with self.sync_lock:
+            if self.sync_timer is not None:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+            if self.handle is not None:
+                self.handle.flush()
+                os.fsync(self.handle.fileno())
+                self.handle.close()
+                self.handle = None
+
+
+class BackgroundWriter:
+    # Runs a TodoJournal's disk work on a thread of its own. append() only
+    # queues the records; whatever has piled up by the time the thread gets
+    # to it goes out as one write and one fsync, so a burst of edits never
+    # makes the Tk thread wait on the disk
+    def __init__(self, journal):
+        self.journal = journal
+        self.pending = queue.Queue()
+        self.unfolded = 0
+        self.latency = None
+        self.write_error = None
+        self.recovered = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def load(self, progress=None):
+        todos = self.journal.load(progress)
+        self.recovered = self.journal.recovered
+        self.unfolded = self.journal.records
+        return todos
+
+    def create_index(self, todos):
+        return self.journal.create_index(todos)
+
+    def max_id(self, todos):
+        return self.journal.max_id(todos)
+
+    def append(self, records, todos):
+        self.unfolded += len(records)
+        snapshot = None
+        if self.unfolded >= JOURNAL_COMPACT_EVERY:
+            # Copied here, on the thread that mutates `todos`
+            snapshot = dict(todos)
+            self.unfolded = 0
+        self.pending.put((records, snapshot))
+
+    def checkpoint(self, todos):
+        self.unfolded = 0
+        self.pending.put(((), dict(todos)))
+
+    @property
+    def error(self):
+        # Compactions run on a thread of the journal's own, which reports there
+        return self.write_error or self.journal.error
+
+    @error.setter
+    def error(self, error):
+        self.write_error = self.journal.error = error
+
+    def busy(self):
+        return self.pending.unfinished_tasks > 0 or self.journal.compacting()
+
+    def run(self):
+        while True:
+            items = [self.pending.get()]
+            while True:
+                try:
+                    items.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            started = perf_counter()
+            try:
+                records = []
+                for item in items:
+                    if item is None:
+                        continue
+                    batch, snapshot = item
+                    records.extend(batch)
+                    if snapshot is not None:
+                        # Everything before the snapshot lands in the journal it folds
+                        self.commit(records)
+                        records = []
+                        self.journal.checkpoint(snapshot)
+                self.commit(records)
+            except Exception as e:
+                # Anything escaping here would end the thread and leave flush() waiting forever
+                self.error = e
+            self.latency = perf_counter() - started
+
+            for item in items:
+                self.pending.task_done()
+            if None in items:
+                return
+
+    def commit(self, records):
+        if records:
+            self.journal.write(records)
+            self.journal.sync()
+
+    def flush(self):
+        # Blocks until everything queued so far is on disk
+        self.pending.join()
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        self.journal.close()
+
+
+class TrigramIndex:
+    # Inverted index from every three-character substring of a task's
+    # lowercased text to the ids containing it. A substring search only has
+    # to verify the intersection of the query's posting sets.
+    def __init__(self):
+        self.postings = {}
+        self.texts = {}
+
+    @staticmethod
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, task_id, text):
+        text = text.lower()
+        self.texts[task_id] = text
+        for gram in self.trigrams(text):
+            self.postings.setdefault(gram, set()).add(task_id)
+
+    def remove(self, task_id):
+        text = self.texts.pop(task_id, None)
+        if text is None:
+            return
+        for gram in self.trigrams(text):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def candidates(self, query):
+        # None when the query is too short to narrow anything down
+        if len(query) < 3:
+            return None
+        empty = set()
+        return [self.postings.get(gram, empty) for gram in self.trigrams(query)]
+
+    def matches(self, task_id, query):
+        return query in self.texts[task_id]
+
+
+class TaskStats:
+    # Running totals behind the statistics panel, overall and broken down by
+    # priority and category as [total, completed] pairs
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.by_priority = {}
+        self.by_category = {}
+
+    def count(self, priority, category, completed, n=1):
+        self.total += n
+        self.completed += n if completed else 0
+        for breakdown, key in ((self.by_priority, priority), (self.by_category, category)):
+            counts = breakdown.setdefault(key, [0, 0])
+            counts[0] += n
+            counts[1] += n if completed else 0
+
+    def add(self, task):
+        self.count(task.priority, task.category, task.completed)
+
+    def remove(self, task):
+        self.count(task.priority, task.category, task.completed, -1)
+
+    def merge(self, other):
+        self.total += other.total
+        self.completed += other.completed
+        for breakdown, counts in ((self.by_priority, other.by_priority), (self.by_category, other.by_category)):
+            for key, (total, completed) in counts.items():
+                mine = breakdown.setdefault(key, [0, 0])
+                mine[0] += total
+                mine[1] += completed
+
+
+class DueScheduler:
+    # Min-heap of (due day, task id) for pending tasks with a due date.
+    # An edit just pushes a fresh entry; the outdated one is skipped when it
+    # reaches the top, so no task is ever rescanned or reparsed.
+    def __init__(self):
+        self.heap = []
+        self.due = {}
+        self.overdue = set()
+
+    def add(self, task):
+        if task.completed or task.due_ordinal is None:
+            return
+        self.due[task.id] = task.due_ordinal
+        heapq.heappush(self.heap, (task.due_ordinal, task.id))
+        if len(self.heap) > 2 * len(self.due) + 1024:
+            # Too many outdated entries piled up; rebuild from the live ones
+            self.heap = [(ordinal, task_id) for task_id, ordinal in self.due.items()]
+            heapq.heapify(self.heap)
+
+    def remove(self, task):
+        self.due.pop(task.id, None)
+        self.overdue.discard(task.id)
+
+    def pop_overdue(self, today):
+        # Moves every task due before `today` into `overdue` and returns them
+        newly_overdue = []
+        while self.heap and self.heap[0][0] < today:
+            ordinal, task_id = heapq.heappop(self.heap)
+            if self.due.get(task_id) == ordinal:
+                del self.due[task_id]
+                self.overdue.add(task_id)
+                newly_overdue.append(task_id)
+        return newly_overdue
+
+    def next_due(self):
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+
+class TaskIndex:
+    # Secondary indexes from priority, category and completed status to the
+    # ids of the tasks carrying them, plus a trigram index over the task
+    # text, kept up to date on every mutation
+    def __init__(self):
+        self.by_priority = {}
+        self.by_category = {}
+        self.by_status = {True: set(), False: set()}
+        self.text = TrigramIndex()
+        self.stats = TaskStats()
+        self.due = DueScheduler()
+        # column -> sorted [(key, id)], built on the first sort by that
+        # column and kept sorted on every mutation afterwards
+        self.orders = {}
+        self.orders_lock = threading.Lock()
+        self.orders_version = 0
+
+    def add(self, task):
+        with self.orders_lock:
+            self.orders_version += 1
+            for column, order in self.orders.items():
+                bisect.insort(order, (SORT_KEYS[column](task), task.id))
+        self.stats.add(task)
+        self.due.add(task)
+        self.by_priority.setdefault(task.priority, set()).add(task.id)
+        self.by_category.setdefault(task.category, set()).add(task.id)
+        self.by_status[task.completed].add(task.id)
+        self.text.add(task.id, task.text)
+
+    def remove(self, task):
+        with self.orders_lock:
+            self.orders_version += 1
+            for column, order in self.orders.items():
+                entry = (SORT_KEYS[column](task), task.id)
+                position = bisect.bisect_left(order, entry)
+                if position < len(order) and order[position] == entry:
+                    del order[position]
+        self.stats.remove(task)
+        self.due.remove(task)
+        self.by_priority.get(task.priority, set()).discard(task.id)
+        self.by_category.get(task.category, set()).discard(task.id)
+        self.by_status[task.completed].discard(task.id)
+        self.text.remove(task.id)
+
+    def drop_orders(self):
+        # Cheaper to re-sort once than to insort every row of a bulk import
+        with self.orders_lock:
+            self.orders_version += 1
+            self.orders.clear()
+
+    def ordered(self, todos, column, reverse=False, matches=None, filters=None):
+        # Task ids in column order, restricted to `matches` when given
+        if column == "ID":
+            # Not the dict's order: undo and merges from other processes put
+            # tasks back at its end. Nearly sorted input sorts in linear time
+            return sorted(todos if matches is None else matches, reverse=reverse)
+
+        order = self.orders.get(column)
+        if order is None:
+            version = self.orders_version
+            order = sorted((SORT_KEYS[column](task), task.id) for task in todos.values())
+            with self.orders_lock:
+                if version != self.orders_version:
+                    raise RuntimeError("tasks changed while sorting")
+                self.orders[column] = order
+
+        if matches is not None and len(matches) < len(order) // 16:
+            # A few matches sort faster on their own than by walking the ordering
+            key = SORT_KEYS[column]
+            return sorted(matches, key=lambda task_id: (key(todos[task_id]), task_id), reverse=reverse)
+        ids = (task_id for key, task_id in (reversed(order) if reverse else order))
+        if matches is None:
+            return list(ids)
+        return [task_id for task_id in ids if task_id in matches]
+
+    def view_stats(self, task_ids, filters):
+        # Counts for a filtered view from set intersections, no per-task work
+        stats = TaskStats()
+        done = self.by_status[True] & task_ids
+        stats.total, stats.completed = len(task_ids), len(done)
+        for breakdown, index in ((stats.by_priority, self.by_priority), (stats.by_category, self.by_category)):
+            for key, members in index.items():
+                breakdown[key] = [len(members & task_ids), len(members & done)]
+        return stats
+
+    def query(self, priority="All", category="All", status="All", search="", cancelled=None):
+        # Returns None when no filter is set, otherwise the matching id set.
+        # `cancelled` is polled while verifying candidates so a stale search
+        # running off the Tk thread can give up early.
+        search = search.lower()
+        sets = []
+        if priority != "All":
+            sets.append(self.by_priority.get(priority, set()))
+        if category != "All":
+            sets.append(self.by_category.get(category, set()))
+        if status != "All":
+            sets.append(self.by_status[status == "Completed"])
+        if search:
+            sets.extend(self.text.candidates(search) or [])
+        if not sets:
+            if not search:
+                return None
+            sets.append(self.text.texts.keys())
+
+        sets.sort(key=len)
+        ids = set(sets[0]).intersection(*sets[1:])
+        if search:
+            matched = set()
+            for count, task_id in enumerate(ids):
+                if cancelled is not None and not count % 4096 and cancelled():
+                    break
+                if self.text.matches(task_id, search):
+                    matched.add(task_id)
+            ids = matched
+        return ids
+
+
+class SqliteBackend:
+    # Stores tasks in an indexed SQLite table. Nothing is loaded up front:
+    # rows are read on demand through SqliteTaskMap and filters run as SQL.
+    def __init__(self, db_file, data_file=None):
+        self.db_file = db_file
+        self.data_file = data_file
+        self.local = threading.local()
+        self.recovered = None
+        self.latency = None
+        self.error = None
+        self.data_version = None
+
+    def connection(self):
+        # sqlite3 connections are per thread; WAL lets readers run alongside the writer
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def load(self, progress=None):
+        fresh = not os.path.exists(self.db_file)
+        conn = self.connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                task TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                category TEXT NOT NULL,
+                due_date TEXT NOT NULL,
+                completed INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_priority ON tasks(priority);
+            CREATE INDEX IF NOT EXISTS tasks_category ON tasks(category);
+            CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks(due_date);
+            CREATE INDEX IF NOT EXISTS tasks_completed ON tasks(completed);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        todos = SqliteTaskMap(self)
+        if fresh and self.data_file and os.path.exists(self.data_file):
+            # First run on SQLite: bring the existing JSON tasks over once
+            journal = TodoJournal(self.data_file)
+            for task in journal.load().values():
+                todos[task.id] = task
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('next_id', ?)", (journal.max_id({}) + 1,))
+            conn.commit()
+            self.recovered = journal.recovered
+        return todos
+
+    def create_index(self, todos):
+        return SqliteIndex(self)
+
+    def max_id(self, todos):
+        # Ids of deleted tasks stay taken through meta's next_id, see SqliteTaskMap
+        return self.connection().execute(
+            "SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM tasks),"
+            " (SELECT COALESCE(MAX(value), 1) - 1 FROM meta WHERE key = 'next_id'))"
+        ).fetchone()[0]
+
+    def append(self, records, todos):
+        # SqliteTaskMap already wrote the rows on this thread's connection, so
+        # the commit has to happen here; WAL with synchronous=NORMAL keeps it
+        # free of fsyncs
+        started = perf_counter()
+        self.connection().commit()
+        self.latency = perf_counter() - started
+
+    def checkpoint(self, todos):
+        self.append((), todos)
+
+    def flush(self):
+        self.connection().commit()
+
+    def busy(self):
+        return False
+
+    def poll(self, todos):
+        # data_version moves whenever another connection commits. SQLite cannot
+        # say what changed, so None asks the caller to rebuild its index
+        version = self.connection().execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return []
+        self.data_version = version
+        todos.cache.clear()
+        return None
+
+    def reserve_ids(self, count, floor):
+        conn = self.connection()
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        stored = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        first = max(floor, stored[0] if stored else 0, self.max_id(None) + 1)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('next_id', ?)", (first + count,))
+        conn.commit()
+        return first
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+class SqliteTaskMap(MutableMapping):
+    # Dict-like id -> task view over the tasks table with a small LRU cache,
+    # so only the rows actually on screen are ever materialized
+    def __init__(self, backend):
+        self.backend = backend
+        self.cache = OrderedDict()
+
+    def __getitem__(self, task_id):
+        task = self.cache.get(task_id)
+        if task is None:
+            row = self.backend.connection().execute(
+                "SELECT * FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(task_id)
+            task = self.cache[task_id] = Task(*row)
+            if len(self.cache) > SQLITE_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(task_id)
+        return task
+
+    def __setitem__(self, task_id, task):
+        self.backend.connection().execute(
+            "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (task_id, task.text, task.priority, task.category, task.due_date, int(task.completed), task.created_at)
+        )
+        self.cache.pop(task_id, None)
+
+    def __delitem__(self, task_id):
+        conn = self.backend.connection()
+        if conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount == 0:
+            raise KeyError(task_id)
+        conn.execute(
+            "INSERT INTO meta VALUES ('next_id', ?) ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+            (task_id + 1,)
+        )
+        self.cache.pop(task_id, None)
+
+    def __contains__(self, task_id):
+        if task_id in self.cache:
+            return True
+        return self.backend.connection().execute(
+            "SELECT 1 FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        for (task_id,) in self.backend.connection().execute("SELECT id FROM tasks ORDER BY id"):
+            yield task_id
+
+    def __len__(self):
+        return self.backend.connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+
+class SqliteIndex:
+    # TaskIndex counterpart that pushes every filter down into SQL. Only the
+    # statistics are kept in memory, counted once and then maintained.
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = self.grouped_stats("", [])
+        self.due = DueScheduler()
+        rows = self.backend.connection().execute(
+            "SELECT id, due_date FROM tasks WHERE completed = 0 AND due_date != ''"
+        )
+        for task_id, due_date in rows:
+            self.due.add(Task(task_id, "", due_date=due_date))
+
+    def add(self, task):
+        self.stats.add(task)
+        self.due.add(task)
+
+    def remove(self, task):
+        self.stats.remove(task)
+        self.due.remove(task)
+
+    def drop_orders(self):
+        pass
+
+    def grouped_stats(self, where, params):
+        stats = TaskStats()
+        rows = self.backend.connection().execute(
+            "SELECT priority, category, completed, COUNT(*) FROM tasks " + where +
+            " GROUP BY priority, category, completed", params
+        )
+        for priority, category, completed, n in rows:
+            stats.count(priority, category, bool(completed), n)
+        return stats
+
+    def view_stats(self, task_ids, filters):
+        return self.grouped_stats(*self.where(*filters))
+
+    sort_columns = {
+        "ID": "id",
+        "Task": "lower(task)",
+        "Priority": "CASE priority WHEN 'High' THEN 0 WHEN 'Medium' THEN 1 WHEN 'Low' THEN 2 ELSE 3 END",
+        "Category": "category",
+        "Due Date": "due_date = '', due_date",
+        "Status": "completed"
+    }
+
+    def ordered(self, todos, column, reverse=False, matches=None, filters=("All", "All", "All", "")):
+        direction = " DESC" if reverse else ""
+        order_by = ", ".join(part + direction for part in self.sort_columns[column].split(", "))
+        where, params = self.where(*filters)
+        rows = self.backend.connection().execute(
+            f"SELECT id FROM tasks {where} ORDER BY {order_by}, id{direction}", params
+        )
+        return [task_id for (task_id,) in rows]
+
+    def where(self, priority="All", category="All", status="All", search=""):
+        clauses, params = [], []
+        if priority != "All":
+            clauses.append("priority = ?")
+            params.append(priority)
+        if category != "All":
+            clauses.append("category = ?")
+            params.append(category)
+        if status != "All":
+            clauses.append("completed = ?")
+            params.append(int(status == "Completed"))
+        if search:
+            clauses.append("instr(lower(task), ?) > 0")
+            params.append(search.lower())
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, priority="All", category="All", status="All", search="", cancelled=None):
+        where, params = self.where(priority, category, status, search)
+        if not where:
+            return None
+
+        conn = self.backend.connection()
+        if cancelled is not None:
+            conn.set_progress_handler(cancelled, 10000)
+        try:
+            rows = conn.execute("SELECT id FROM tasks " + where, params)
+            return {task_id for (task_id,) in rows}
+        except sqlite3.OperationalError:
+            # Interrupted by the progress handler: the query went stale
+            return set()
+        finally:
+            conn.set_progress_handler(None, 0)
+
+
+def same_task(a, b):
+    # The SQLite backend hands out fresh Task objects, so compare fields, not identity
+    return a is b or (a is not None and b is not None and a.to_dict() == b.to_dict())
+
+
+class History:
+    # Undo/redo log. Every action is kept as its list of (old, new) task
+    # pairs; tasks are never mutated, so these are references rather than
+    # copies and undoing a bulk delete costs about as much as the delete did.
+    # The oldest actions are forgotten once there are more than `depth` of
+    # them or more than `max_changes` pairs in total.
+    def __init__(self, depth=UNDO_DEPTH, max_changes=UNDO_MAX_CHANGES):
+        self.depth = depth
+        self.max_changes = max_changes
+        self.undo_stack = deque()
+        self.redo_stack = deque()
+        self.pending = []
+        self.size = 0
+
+    def record(self, old_task, new_task):
+        self.pending.append((old_task, new_task))
+
+    def commit(self):
+        # Closes the action recorded since the last commit
+        if not self.pending:
+            return
+        self.size -= sum(len(changes) for changes in self.redo_stack)
+        self.redo_stack.clear()
+        self.undo_stack.append(self.pending)
+        self.size += len(self.pending)
+        self.pending = []
+        while self.undo_stack and (len(self.undo_stack) > self.depth or self.size > self.max_changes):
+            self.size -= len(self.undo_stack.popleft())
+
+    def take_undo(self):
+        if not self.undo_stack:
+            return None
+        changes = self.undo_stack.pop()
+        self.redo_stack.append(changes)
+        return changes
+
+    def take_redo(self):
+        if not self.redo_stack:
+            return None
+        changes = self.redo_stack.pop()
+        self.undo_stack.append(changes)
+        return changes
+
+
+class TodoStore:
+    # The task list without any Tk: the tasks, their index and the storage
+    # backend behind them. TodoApp drives one, and so does main() below.
+    def __init__(self, data_file="todos.json", backend=STORAGE_BACKEND, shared=SHARED_STORE, background=False,
+                 undo_depth=UNDO_DEPTH, undo_changes=UNDO_MAX_CHANGES):
+        self.data_file = data_file
+        if backend == "sqlite":
+            self.storage = SqliteBackend(os.path.splitext(data_file)[0] + ".db", data_file)
+        elif shared:
+            # Other processes must see every write as soon as save() returns
+            self.storage = TodoJournal(data_file, shared=True)
+        elif background:
+            self.storage = BackgroundWriter(TodoJournal(data_file))
+        else:
+            self.storage = TodoJournal(data_file)
+        self.shared = shared
+        self.todos = {}
+        self.index = TaskIndex()
+        self.next_id = 1
+        self.history = History(undo_depth, undo_changes)
+        # Tasks the last undo() or redo() left alone because they had changed since
+        self.conflicts = 0
+
+    def read(self, progress=None):
+        # Safe to run on a loader thread: nothing is kept until attach()
+        todos = self.storage.load(progress)
+        return todos, self.storage.create_index(todos), self.storage.max_id(todos) + 1
+
+    def attach(self, todos, index, next_id):
+        self.todos, self.index, self.next_id = todos, index, next_id
+
+    def load(self, progress=None):
+        self.attach(*self.read(progress))
+        return self
+
+    def allocate_ids(self, count):
+        # In shared mode other processes draw ids from the same store
+        if self.shared:
+            self.next_id = self.storage.reserve_ids(count, self.next_id)
+        first = self.next_id
+        self.next_id += count
+        return first
+
+    def put(self, task):
+        old_task = self.todos.get(task.id)
+        self.history.record(old_task, task)
+        return self.swap(old_task, task)
+
+    def insert(self, tasks):
+        # Bulk put() of new tasks, e.g. an import: no journal records and no
+        # undo step, so checkpoint() has to follow to write them out
+        for task in tasks:
+            self.todos[task.id] = task
+            self.index.add(task)
+
+    def remove(self, task_id):
+        old_task = self.todos[task_id]
+        self.history.record(old_task, None)
+        return self.swap(old_task, None)
+
+    def swap(self, old_task, new_task):
+        # Replaces old_task by new_task (either may be None) in the tasks and
+        # the index, and returns the journal record for it
+        if old_task is not None:
+            self.index.remove(old_task)
+            if new_task is None:
+                del self.todos[old_task.id]
+                return {"op": "delete", "id": old_task.id}
+        self.todos[new_task.id] = new_task
+        self.index.add(new_task)
+        return {"op": "put", "task": new_task.to_dict()}
+
+    def save(self, *records):
+        # Everything put or removed since the last save is one undoable action.
+        # Returns True when changes by other processes were merged on the way
+        self.history.commit()
+        self.storage.append(records, self.todos)
+        return self.shared and self.poll()
+
+    def checkpoint(self):
+        self.history.commit()
+        self.storage.checkpoint(self.todos)
+        return self.shared and self.poll()
+
+    def undo(self):
+        # Like put() and remove(), returns the records for the caller to save();
+        # an empty list when there is nothing to undo
+        changes = self.history.take_undo()
+        if changes is None:
+            return []
+        return self.restore((new_task, old_task) for old_task, new_task in reversed(changes))
+
+    def redo(self):
+        changes = self.history.take_redo()
+        if changes is None:
+            return []
+        return self.restore(changes)
+
+    def restore(self, changes):
+        # A task that no longer is what the history left it as was changed
+        # since, most likely by another process; that newer edit wins
+        records = []
+        self.conflicts = 0
+        for expected, target in changes:
+            current = self.todos.get((expected or target).id)
+            if same_task(current, target):
+                continue
+            if not same_task(current, expected):
+                self.conflicts += 1
+                continue
+            records.append(self.swap(current, target))
+        return records
+
+    def poll(self):
+        # Folds tasks changed by other processes into the index
+        changes = self.storage.poll(self.todos)
+        if changes is not None and not changes:
+            return False
+        if changes is None:
+            self.index = self.storage.create_index(self.todos)
+            self.next_id = max(self.next_id, self.storage.max_id(self.todos) + 1)
+        else:
+            for old_task, new_task in changes:
+                if old_task is not None:
+                    self.index.remove(old_task)
+                if new_task is not None:
+                    self.index.add(new_task)
+                    self.next_id = max(self.next_id, new_task.id + 1)
+        return True
+
+    def add(self, text, priority="Medium", category="Personal", due_date=""):
+        task = Task(
+            self.allocate_ids(1),
+            text,
+            priority=priority,
+            category=category,
+            due_date=due_date,
+            created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        self.save(self.put(task))
+        return task
+
+    def complete(self, task_ids):
+        # One journal write for the whole selection
+        records = [
+            self.put(self.todos[task_id].replace(completed=True))
+            for task_id in task_ids if task_id in self.todos and not self.todos[task_id].completed
+        ]
+        if records:
+            self.save(*records)
+        return len(records)
+
+    def delete(self, task_ids):
+        records = [self.remove(task_id) for task_id in task_ids if task_id in self.todos]
+        if records:
+            self.save(*records)
+        return len(records)
+
+    def query(self, priority="All", category="All", status="All", search="", sort="ID", reverse=False):
+        filters = (priority, category, status, search)
+        matches = self.index.query(*filters)
+        return self.index.ordered(self.todos, sort, reverse, matches=matches, filters=filters)
+
+    def stats(self, priority="All", category="All", status="All", search=""):
+        filters = (priority, category, status, search)
+        matches = self.index.query(*filters)
+        if matches is None:
+            return self.index.stats
+        return self.index.view_stats(matches, filters)
+
+    def flush(self):
+        self.storage.flush()
+
+    def close(self):
+        self.storage.flush()
+        self.storage.close()
+
+
+def add_filter_arguments(parser):
+    parser.add_argument("--priority", choices=["All"] + list(PRIORITY_RANK), default="All")
+    parser.add_argument("--category", choices=["All"] + CATEGORIES, default="All")
+    parser.add_argument("--status", choices=["All", "Completed", "Pending"], default="All")
+    parser.add_argument("--search", default="", help="text the task must contain")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work with the to-do list without opening the window.")
+    parser.add_argument("--file", default="todos.json", help="task file (default: todos.json)")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default=STORAGE_BACKEND)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a task")
+    add.add_argument("text")
+    add.add_argument("--priority", choices=list(PRIORITY_RANK), default="Medium")
+    add.add_argument("--category", choices=CATEGORIES, default="Personal")
+    add.add_argument("--due", default="", help="due date as YYYY-MM-DD")
+
+    complete = commands.add_parser("complete", help="mark tasks complete, by id or by filter")
+    complete.add_argument("ids", nargs="*", type=int)
+    add_filter_arguments(complete)
+
+    query = commands.add_parser("query", help="list matching tasks")
+    add_filter_arguments(query)
+    query.add_argument("--sort", choices=list(SORT_KEYS), default="ID")
+    query.add_argument("--reverse", action="store_true")
+    query.add_argument("--limit", type=int, help="show at most this many tasks")
+    query.add_argument("--json", action="store_true", help="print JSON Lines instead of a table")
+
+    stats = commands.add_parser("stats", help="count tasks, optionally of a filtered view")
+    add_filter_arguments(stats)
+
+    args = parser.parse_args(argv)
+    if args.command == "add" and args.due and due_ordinal(args.due) is None:
+        parser.error("--due must be a date in YYYY-MM-DD format")
+
+    store = TodoStore(args.file, backend=args.backend).load()
+    try:
+        if args.command == "add":
+            task = store.add(args.text, args.priority, args.category, args.due)
+            print(f"Added task {task.id}")
+
+        elif args.command == "complete":
+            filters = (args.priority, args.category, args.status, args.search)
+            if args.ids:
+                task_ids = args.ids
+            elif filters != ("All", "All", "All", ""):
+                task_ids = store.query(*filters)
+            else:
+                parser.error("give task ids or at least one filter")
+            print(f"Marked {store.complete(task_ids)} task(s) as complete")
+
+        elif args.command == "query":
+            task_ids = store.query(args.priority, args.category, args.status, args.search, args.sort, args.reverse)
+            for task_id in task_ids[:args.limit]:
+                task = store.todos[task_id]
+                if args.json:
+                    print(json.dumps(task.to_dict(), ensure_ascii=False))
+                else:
+                    status = "Completed" if task.completed else "Pending"
+                    print(f"{task.id}\t{status}\t{task.priority}\t{task.category}\t{task.due_date or '-'}\t{task.text}")
+
+        else:
+            result = store.stats(args.priority, args.category, args.status, args.search)
+            print(f"Total: {result.total}  Completed: {result.completed}  Pending: {result.total - result.completed}")
+            for title, breakdown in (("Priority", result.by_priority), ("Category", result.by_category)):
+                parts = [f"{key} {done}/{count}" for key, (count, done) in breakdown.items() if count]
+                if parts:
+                    print(f"{title}: " + " · ".join(parts))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())